@@ -2,3 +2,8 @@ import os
 from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE','backend.settings')
 application = get_asgi_application()
+
+from django.conf import settings
+if settings.ML_PRELOAD_MODELS:
+    from inventory.ml_service import model_cache
+    model_cache.preload()
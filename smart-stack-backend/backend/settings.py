@@ -88,3 +88,47 @@ SWAGGER_SETTINGS = {
 
 AUTH_USER_MODEL = "inventory.User"
 
+# Worker processes used when retraining models from the API (see train_models --workers)
+ML_TRAIN_WORKERS = int(os.environ.get("ML_TRAIN_WORKERS", "1"))
+
+# Loaded models kept in memory per process, and whether to load them all at worker start
+ML_MODEL_CACHE_SIZE = int(os.environ.get("ML_MODEL_CACHE_SIZE", "512"))
+ML_PRELOAD_MODELS = os.environ.get("ML_PRELOAD_MODELS", "0") == "1"
+
+# Request coalescing (inventory/singleflight.py) is per worker process: with N
+# workers, up to N identical predictions/trend queries can still run at once,
+# and /api/ml/cache-stats/ reports the counters of whichever worker answered.
+
+
+# "sku": one model per SKU; "global": score every SKU with the train_models --global model
+ML_MODEL_MODE = os.environ.get("ML_MODEL_MODE", "sku")
+
+# Cache backend (locmem by default; use a shared backend such as
+# django.core.cache.backends.filebased.FileBasedCache so invalidation
+# reaches every worker process)
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.environ.get("CACHE_LOCATION", "smart-stock"),
+    }
+}
+
+# Upper bound on how long a cached dashboard summary is served (seconds)
+DASHBOARD_CACHE_TTL = int(os.environ.get("DASHBOARD_CACHE_TTL", "300"))
+
+# Stateless JWT: build request.user from the token's role/email claims instead
+# of loading the User row on every request. Users are re-checked (active,
+# role) at most once per JWT_REVOCATION_CACHE_TTL seconds; 0 disables it.
+JWT_STATELESS_AUTH = os.environ.get("JWT_STATELESS_AUTH", "0") == "1"
+JWT_REVOCATION_CACHE_TTL = int(os.environ.get("JWT_REVOCATION_CACHE_TTL", "60"))
+SIMPLE_JWT["TOKEN_USER_CLASS"] = "inventory.authentication.RoleTokenUser"
+if JWT_STATELESS_AUTH:
+    REST_FRAMEWORK["DEFAULT_AUTHENTICATION_CLASSES"] = (
+        "inventory.authentication.StatelessRoleJWTAuthentication",
+    )
+
+# Age (seconds) after which a reorder suggestion snapshot is refreshed in the
+# background; the stale snapshot keeps being served until the new one is ready.
+# A scope's first snapshot is built inline, once across workers via a cache
+# lock (shared cache backend required, see CACHES)
+REORDER_SNAPSHOT_TTL = int(os.environ.get("REORDER_SNAPSHOT_TTL", "900"))
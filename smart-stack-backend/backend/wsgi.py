@@ -2,3 +2,8 @@ import os
 from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE','backend.settings')
 application = get_wsgi_application()
+
+from django.conf import settings
+if settings.ML_PRELOAD_MODELS:
+    from inventory.ml_service import model_cache
+    model_cache.preload()
@@ -1,12 +1,17 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import User, Store, Product, Stock, Transaction, ReorderPrediction
+from .models import User, Store, Product, Stock, Transaction, ReorderPrediction, SalesChunkHash, TrainingWatermark, DailySales, Job, ReorderSnapshot
 
 admin.site.register(Store)
 admin.site.register(Product)
 admin.site.register(Stock)
 admin.site.register(Transaction)
 admin.site.register(ReorderPrediction)
+admin.site.register(SalesChunkHash)
+admin.site.register(TrainingWatermark)
+admin.site.register(DailySales)
+admin.site.register(Job)
+admin.site.register(ReorderSnapshot)
 
 
 
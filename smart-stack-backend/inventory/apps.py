@@ -2,3 +2,7 @@ from django.apps import AppConfig
 class InventoryConfig(AppConfig):
     default_auto_field='django.db.models.BigAutoField'
     name='inventory'
+
+    def ready(self):
+        # Connect the dashboard cache and JWT user-state invalidation receivers
+        from . import authentication, dashboard_service  # noqa: F401
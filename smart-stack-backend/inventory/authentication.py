@@ -0,0 +1,84 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+User = get_user_model()
+
+USER_STATE_KEY = "jwt-user-state:{}"
+
+
+# =========================
+# TOKEN USER
+# =========================
+class RoleTokenUser(TokenUser):
+    """
+    Request user built from the access token alone. Exposes the `role` and
+    `email` claims added by EmailTokenObtainPairSerializer, which is all
+    the permission classes read.
+    """
+
+    @cached_property
+    def role(self) -> str:
+        return self.token.get("role", "staff")
+
+    @cached_property
+    def email(self) -> str:
+        return self.token.get("email", "")
+
+    def __str__(self) -> str:
+        return f"{self.email} ({self.role})"
+
+
+# =========================
+# AUTHENTICATION
+# =========================
+def user_state(user_id):
+    """
+    (is_active, role) for a user, cached for JWT_REVOCATION_CACHE_TTL
+    seconds. Returns None if the user no longer exists.
+    """
+    key = USER_STATE_KEY.format(user_id)
+    state = cache.get(key)
+    if state is None:
+        row = User.objects.filter(**{api_settings.USER_ID_FIELD: user_id}).values_list("is_active", "role").first()
+        state = tuple(row) if row else ()
+        cache.set(key, state, settings.JWT_REVOCATION_CACHE_TTL)
+    return state or None
+
+
+class StatelessRoleJWTAuthentication(JWTStatelessUserAuthentication):
+    """
+    JWT authentication without a User query per request: request.user is a
+    RoleTokenUser built from the token's claims.
+
+    With JWT_REVOCATION_CACHE_TTL > 0, each token is also checked against
+    the user's cached (is_active, role). Deactivated or deleted users, and
+    tokens whose role claim is out of date, are rejected within TTL
+    seconds, at the cost of one lookup per user per TTL. Set it to 0 to
+    trust tokens until they expire.
+    """
+
+    def get_user(self, validated_token):
+        user = super().get_user(validated_token)
+
+        if settings.JWT_REVOCATION_CACHE_TTL > 0:
+            state = user_state(user.id)
+            if state is None or not state[0]:
+                raise AuthenticationFailed("User is inactive or no longer exists", code="user_inactive")
+            if state[1] != user.role:
+                raise AuthenticationFailed("Token role is out of date, log in again", code="role_changed")
+
+        return user
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def _forget_user_state(sender, instance, **kwargs):
+    cache.delete(USER_STATE_KEY.format(getattr(instance, api_settings.USER_ID_FIELD)))
@@ -0,0 +1,83 @@
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import DailySales, Product, Stock
+from .signals import sales_changed
+
+# --------------------------------------------------
+# Settings
+# --------------------------------------------------
+LOW_STOCK_THRESHOLD = 10
+CACHE_KEY_PREFIX = "dashboard-summary"
+
+
+def _cache_key(day: date) -> str:
+    # Keyed by day so "today's sales" never outlives midnight
+    return f"{CACHE_KEY_PREFIX}:{day.isoformat()}"
+
+
+# --------------------------------------------------
+# Summary
+# --------------------------------------------------
+def compute_summary(today: date | None = None) -> dict:
+    """
+    Dashboard numbers in four queries: product count, one Stock aggregate
+    (total and low-stock count), and two over the DailySales rollup
+    (today's sales, top SKU).
+    """
+    today = today or date.today()
+
+    stock = Stock.objects.aggregate(
+        total=Sum("quantity"),
+        low=Count("id", filter=Q(quantity__lt=LOW_STOCK_THRESHOLD)),
+    )
+    top_sku = (
+        DailySales.objects
+        .values("product__sku")
+        .annotate(total=Sum("qty"))
+        .order_by("-total")
+        .first()
+    )
+
+    return {
+        "total_products": Product.objects.count(),
+        "total_stock": stock["total"] or 0,
+        "low_stock_items": stock["low"],
+        "today_sales": DailySales.objects.filter(date=today).aggregate(total=Sum("qty"))["total"] or 0,
+        "top_sku": top_sku["product__sku"] if top_sku else None,
+    }
+
+
+def get_summary() -> dict:
+    """Cached dashboard summary; recomputed after invalidation or DASHBOARD_CACHE_TTL."""
+    today = date.today()
+    key = _cache_key(today)
+
+    summary = cache.get(key)
+    if summary is None:
+        summary = compute_summary(today)
+        cache.set(key, summary, settings.DASHBOARD_CACHE_TTL)
+    return summary
+
+
+def invalidate_summary():
+    cache.delete(_cache_key(date.today()))
+
+
+# --------------------------------------------------
+# Invalidation hooks
+# --------------------------------------------------
+@receiver(sales_changed)
+@receiver(post_save, sender=Stock)
+@receiver(post_delete, sender=Stock)
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def _invalidate_on_change(sender, **kwargs):
+    # After commit, so a concurrent request can't re-cache pre-commit numbers
+    transaction.on_commit(invalidate_summary)
@@ -0,0 +1,100 @@
+import csv
+import io
+import json
+
+# --------------------------------------------------
+# Settings
+# --------------------------------------------------
+EXPORT_CHUNK_SIZE = 2000  # rows fetched per query and written per streamed chunk
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+TRANSACTION_COLUMNS = {
+    "id": "id",
+    "date": "date",
+    "store": "store__name",
+    "sku": "product__sku",
+    "quantity_sold": "quantity_sold",
+    "unit_price": "unit_price",
+}
+STOCK_COLUMNS = {
+    "id": "id",
+    "store": "store__name",
+    "sku": "product__sku",
+    "product": "product__name",
+    "quantity": "quantity",
+    "last_updated": "last_updated",
+}
+
+
+# --------------------------------------------------
+# Row sources
+# --------------------------------------------------
+def iter_queryset_rows(queryset, fields: list, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """
+    Yield value tuples for a queryset in primary-key order, one bounded
+    query per chunk (WHERE id > last ORDER BY id LIMIT n).
+
+    Keyset chunks rather than .iterator(): MySQL drivers buffer the whole
+    result set client-side, so only bounded queries keep memory flat on
+    every backend.
+    """
+    queryset = queryset.order_by("pk").values_list("pk", *fields)
+    last_pk = None
+
+    while True:
+        page = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        rows = list(page[:chunk_size])
+        if not rows:
+            return
+
+        for row in rows:
+            yield row[1:]
+        last_pk = rows[-1][0]
+
+
+# --------------------------------------------------
+# Encoders
+# --------------------------------------------------
+def _batched(rows, size: int):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def stream_csv(columns: list, rows, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """CSV text in chunks of up to chunk_size rows, header first."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    writer.writerow(columns)
+    for batch in _batched(rows, chunk_size):
+        writer.writerows(batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def stream_ndjson(columns: list, rows, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """One JSON object per line; dates and decimals are written as strings."""
+    for batch in _batched(rows, chunk_size):
+        yield "".join(
+            json.dumps(dict(zip(columns, row)), default=str) + "\n" for row in batch
+        )
+
+
+def stream_rows(fmt: str, columns: list, rows):
+    if fmt == "csv":
+        return stream_csv(columns, rows)
+    return stream_ndjson(columns, rows)
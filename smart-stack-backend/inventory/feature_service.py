@@ -0,0 +1,195 @@
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+from django.db.models import Count, Max, Sum
+
+from .models import DailySales
+
+# --------------------------------------------------
+# Settings
+# --------------------------------------------------
+PRODUCTS_PER_QUERY = 500   # products aggregated per GROUP BY query
+LAG_WINDOW_DAYS = 7        # days of history behind lag1/lag7
+LAST_DATE_SPREAD_DAYS = 30 # products whose last sale is this close share one query
+
+
+# --------------------------------------------------
+# Vectorized daily series
+# --------------------------------------------------
+def densify_daily(df: pd.DataFrame, key: str) -> pd.DataFrame:
+    """
+    Expand long-format (key, date, qty) rows into one row per key per day,
+    from each key's first to last date, filling missing days with 0.
+
+    Equivalent to a per-key resample("D").sum(), done for all keys at once.
+    """
+    if df.empty:
+        return pd.DataFrame({
+            key: pd.Series(dtype="int64"),
+            "date": pd.Series(dtype="datetime64[ns]"),
+            "qty": pd.Series(dtype="int64"),
+        })
+
+    df = df.assign(date=pd.to_datetime(df["date"]))
+    bounds = df.groupby(key)["date"].agg(["min", "max"])
+
+    lengths = ((bounds["max"] - bounds["min"]).dt.days + 1).to_numpy()
+    starts = np.cumsum(lengths) - lengths
+    offsets = np.arange(lengths.sum()) - np.repeat(starts, lengths)
+
+    full_index = pd.MultiIndex.from_arrays(
+        [
+            np.repeat(bounds.index.to_numpy(), lengths),
+            np.repeat(bounds["min"].to_numpy(), lengths) + offsets.astype("timedelta64[D]"),
+        ],
+        names=[key, "date"],
+    )
+
+    return (
+        df.groupby([key, "date"])["qty"].sum()
+        .reindex(full_index, fill_value=0)
+        .reset_index()
+    )
+
+
+def add_lag_features(df: pd.DataFrame, key: str) -> pd.DataFrame:
+    """
+    Add lag1 / lag7 / dow to a dense daily frame sorted by (key, date).
+    Lags never cross from one key's series into the next.
+    """
+    by_key = df.groupby(key, sort=False)["qty"]
+    df["lag1"] = by_key.shift(1).fillna(0)
+    df["lag7"] = by_key.shift(7).fillna(0)
+    df["dow"] = df["date"].dt.dayofweek
+    return df
+
+
+# --------------------------------------------------
+# Training data loader
+# --------------------------------------------------
+def load_daily_sales(product_ids: list) -> pd.DataFrame:
+    """One GROUP BY query (over the DailySales rollup) for the daily quantity of every given product."""
+    rows = (
+        DailySales.objects
+        .filter(product_id__in=product_ids)
+        .values_list("product_id", "date")
+        .annotate(qty=Sum("qty"))
+        .order_by()
+    )
+    return pd.DataFrame.from_records(list(rows), columns=["product_id", "date", "qty"])
+
+
+def load_sales_watermarks(product_ids=None) -> dict:
+    """
+    Current (last_date, row_count, qty_total) per product, in one query.
+    Compared against TrainingWatermark to find SKUs whose data changed.
+    row_count counts (store, day) rollup rows, i.e. what the models see.
+    """
+    qs = DailySales.objects.all()
+    if product_ids is not None:
+        qs = qs.filter(product_id__in=product_ids)
+
+    rows = (
+        qs.values_list("product_id")
+        .annotate(last_date=Max("date"), row_count=Count("id"), qty_total=Sum("qty"))
+        .order_by()
+    )
+    return {pid: (last_date, row_count, qty_total or 0) for pid, last_date, row_count, qty_total in rows}
+
+
+def iter_training_frames(products, products_per_query: int = PRODUCTS_PER_QUERY):
+    """
+    Yield (product, frame) for every product, where frame is a date-indexed
+    daily series with qty and the training features, or None when the
+    product has no transactions.
+
+    Products are aggregated and featurized a chunk at a time, so the number
+    of queries is len(products) / products_per_query.
+    """
+    products = list(products)
+
+    for start in range(0, len(products), products_per_query):
+        chunk = products[start:start + products_per_query]
+
+        daily = densify_daily(load_daily_sales([p.id for p in chunk]), key="product_id")
+        daily = add_lag_features(daily, key="product_id")
+        frames = {
+            pid: frame.drop(columns="product_id").set_index("date")
+            for pid, frame in daily.groupby("product_id", sort=False)
+        }
+
+        for product in chunk:
+            yield product, frames.get(product.id)
+
+
+# --------------------------------------------------
+# Latest features (next-day forecasting)
+# --------------------------------------------------
+def _last_date_groups(last_dates: pd.Series):
+    """
+    Group products whose last sale dates lie within LAST_DATE_SPREAD_DAYS
+    of each other, so each group's lag window is one bounded range query.
+    """
+    last_dates = last_dates.sort_values()
+    group, group_start = [], None
+
+    for pid, last in last_dates.items():
+        if group and (last - group_start).days > LAST_DATE_SPREAD_DAYS:
+            yield group, group_start, last_dates[group[-1]]
+            group = []
+        if not group:
+            group_start = last
+        group.append(pid)
+
+    if group:
+        yield group, group_start, last_dates[group[-1]]
+
+
+def load_latest_features(product_ids=None) -> pd.DataFrame:
+    """
+    Features for forecasting the day after each product's last sale, from
+    daily (not per-transaction) totals:
+    - lag1: qty on the last sales day
+    - lag7: qty six days before that
+    - dow:  weekday of the day being forecast
+
+    Indexed by product_id. Runs one query for the last dates plus one
+    range query per cluster of similar last dates (usually just one).
+    """
+    qs = DailySales.objects.all()
+    if product_ids is not None:
+        qs = qs.filter(product_id__in=product_ids)
+
+    last_dates = pd.Series(dict(
+        qs.values_list("product_id").annotate(last=Max("date")).order_by()
+    ), dtype="object")
+    if last_dates.empty:
+        return pd.DataFrame(columns=["last_date", "lag1", "lag7", "dow"])
+
+    frames = []
+    for group, first_last, last_last in _last_date_groups(last_dates):
+        rows = (
+            DailySales.objects
+            .filter(
+                product_id__in=group,
+                date__range=(first_last - timedelta(days=LAG_WINDOW_DAYS - 1), last_last),
+            )
+            .values_list("product_id", "date")
+            .annotate(qty=Sum("qty"))
+            .order_by()
+        )
+        frames.append(pd.DataFrame.from_records(list(rows), columns=["product_id", "date", "qty"]))
+
+    daily = pd.concat(frames, ignore_index=True)
+    daily = daily.assign(date=pd.to_datetime(daily["date"])).set_index(["product_id", "date"])["qty"]
+
+    last = pd.to_datetime(last_dates)
+    lag7_day = last - pd.Timedelta(days=LAG_WINDOW_DAYS - 1)
+
+    return pd.DataFrame({
+        "last_date": last,
+        "lag1": daily.reindex(pd.MultiIndex.from_arrays([last.index, last]), fill_value=0).to_numpy(),
+        "lag7": daily.reindex(pd.MultiIndex.from_arrays([last.index, lag7_day]), fill_value=0).to_numpy(),
+        "dow": (last + pd.Timedelta(days=1)).dt.dayofweek,
+    }, index=last.index)
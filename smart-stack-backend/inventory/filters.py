@@ -0,0 +1,24 @@
+import django_filters
+
+from .models import Stock, Transaction
+
+
+# =========================
+# TRANSACTION
+# =========================
+class TransactionFilter(django_filters.FilterSet):
+    date_from = django_filters.DateFilter(field_name="date", lookup_expr="gte")
+    date_to = django_filters.DateFilter(field_name="date", lookup_expr="lte")
+
+    class Meta:
+        model = Transaction
+        fields = ["product__sku", "store__name", "date"]
+
+
+# =========================
+# STOCK
+# =========================
+class StockFilter(django_filters.FilterSet):
+    class Meta:
+        model = Stock
+        fields = ["store", "product", "product__sku", "store__name"]
@@ -0,0 +1,332 @@
+import pandas as pd
+import xxhash
+from django.db import transaction
+
+from . import rollup_service
+from .models import Store, Product, Transaction, SalesChunkHash
+from .utils import bulk_upsert
+
+# --------------------------------------------------
+# Settings
+# --------------------------------------------------
+READ_CHUNK_SIZE = 100_000   # rows parsed per CSV chunk
+BULK_BATCH_SIZE = 5000      # rows per INSERT statement
+
+# Source column -> Transaction field naming
+COLUMN_MAP = {
+    "store_nbr": "store_id",
+    "family": "sku",
+    "sales": "quantity_sold",
+}
+IMPORT_COLUMNS = ["date", "store_id", "sku", "quantity_sold"]
+NATURAL_KEY = ["store_pk", "product_pk", "date"]
+
+
+# --------------------------------------------------
+# Chunk readers
+# --------------------------------------------------
+def normalize_chunk(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Rename source columns and coerce types so every chunk looks like:
+    - date (datetime64)
+    - store_id (str)
+    - sku (str)
+    - quantity_sold (int)
+    """
+    df = df.rename(columns=COLUMN_MAP)[IMPORT_COLUMNS]
+
+    df["date"] = pd.to_datetime(df["date"], errors="coerce")
+    df = df[df["date"].notna() & df["store_id"].notna()]
+
+    df["store_id"] = df["store_id"].astype(int).astype(str)
+    df["sku"] = df["sku"].astype(str)
+    df["quantity_sold"] = df["quantity_sold"].fillna(0).astype(int).clip(lower=0)
+    return df
+
+
+def read_csv_chunks(path: str, chunk_size: int = READ_CHUNK_SIZE):
+    """Yield normalized chunks of a sales CSV without loading the whole file."""
+    wanted = set(COLUMN_MAP) | set(IMPORT_COLUMNS)
+    reader = pd.read_csv(
+        path,
+        chunksize=chunk_size,
+        usecols=lambda col: col in wanted,
+    )
+    for chunk in reader:
+        yield normalize_chunk(chunk)
+
+
+def read_dataset_chunks(dataset, chunk_size: int = READ_CHUNK_SIZE, limit: int = 0):
+    """
+    Yield normalized chunks from an Arrow-backed Hugging Face Dataset.
+
+    Columns are projected and the limit applied on the memory-mapped table
+    before anything is converted to pandas, so only one record batch is
+    materialized at a time.
+    """
+    wanted = set(COLUMN_MAP) | set(IMPORT_COLUMNS)
+    dataset = dataset.select_columns([c for c in dataset.column_names if c in wanted])
+
+    if limit > 0:
+        dataset = dataset.select(range(min(limit, dataset.num_rows)))
+
+    for batch in dataset.with_format("arrow").iter(batch_size=chunk_size):
+        yield normalize_chunk(batch.to_pandas())
+
+
+def limit_chunks(chunks, limit: int = 0):
+    """Stop the chunk stream once `limit` rows have been yielded (0 = no limit)."""
+    remaining = limit
+    for chunk in chunks:
+        if limit > 0:
+            if remaining <= 0:
+                return
+            chunk = chunk.head(remaining)
+            remaining -= len(chunk)
+        yield chunk
+
+
+def align_chunks_by_date(chunks):
+    """
+    Hold back the last date of every chunk and prepend it to the next one,
+    so a date-sorted feed yields chunks that only contain whole days.
+
+    Raises ValueError when a day shows up again after it was yielded (feed
+    not sorted by date): upserting it from a partial slice would delete
+    the rows imported with the earlier slice.
+    """
+    carry = None
+    yielded_through = None
+    for chunk in chunks:
+        if carry is not None:
+            chunk = pd.concat([carry, chunk], ignore_index=True)
+
+        if chunk.empty:
+            carry = None
+            continue
+
+        if yielded_through is not None and (chunk["date"] <= yielded_through).any():
+            day = chunk.loc[chunk["date"] <= yielded_through, "date"].min().date()
+            raise ValueError(
+                f"Sales feed is not sorted by date: {day} appears again after later days; "
+                "sort it by date before importing with --upsert"
+            )
+
+        last_day = chunk["date"].max()
+        carry = chunk[chunk["date"] == last_day]
+        ready = chunk[chunk["date"] != last_day]
+        if not ready.empty:
+            yielded_through = ready["date"].max()
+            yield ready
+
+    if carry is not None and not carry.empty:
+        yield carry
+
+
+# --------------------------------------------------
+# Change detection
+# --------------------------------------------------
+def aggregate_days(df: pd.DataFrame) -> pd.DataFrame:
+    """Collapse a chunk to one row per (date, store, sku)."""
+    return (
+        df.groupby(["date", "store_id", "sku"], as_index=False, sort=True)["quantity_sold"]
+        .sum()
+    )
+
+
+def day_hashes(df: pd.DataFrame) -> pd.Series:
+    """
+    xxh3 digest of each day's (store, sku, qty) rows, indexed by date.
+    Expects the sorted output of aggregate_days so digests are order-independent.
+    """
+    row_hashes = pd.util.hash_pandas_object(
+        df[["store_id", "sku", "quantity_sold"]], index=False
+    )
+    return row_hashes.groupby(df["date"].to_numpy()).agg(
+        lambda h: xxhash.xxh3_64_hexdigest(h.to_numpy().tobytes())
+    )
+
+
+# --------------------------------------------------
+# Columnar importer
+# --------------------------------------------------
+class SalesImporter:
+    """
+    Imports normalized sales chunks into Store, Product and Transaction,
+    keeping the DailySales rollup in step.
+
+    Store/product primary keys are kept as pandas Series indexed by the
+    natural key, so each chunk is resolved with vectorized lookups instead
+    of per-row dict access.
+    """
+
+    def __init__(self, batch_size: int = BULK_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.store_ids = pd.Series(dtype="int64")
+        self.product_ids = pd.Series(dtype="int64")
+        self.product_prices = pd.Series(dtype="object")
+        self.load_maps()
+
+    def load_maps(self):
+        stores = list(Store.objects.values_list("name", "id"))
+        products = list(Product.objects.values_list("sku", "id", "unit_price"))
+
+        self.store_ids = pd.Series(
+            [pk for _, pk in stores], index=[name for name, _ in stores], dtype="int64"
+        )
+        self.product_ids = pd.Series(
+            [pk for _, pk, _ in products], index=[sku for sku, _, _ in products], dtype="int64"
+        )
+        self.product_prices = pd.Series(
+            [price for _, _, price in products], index=self.product_ids.index, dtype="object"
+        )
+
+    def ensure_keys(self, df: pd.DataFrame):
+        """Create any stores/products first seen in this chunk."""
+        new_stores = pd.Index(df["store_id"].unique()).difference(self.store_ids.index)
+        new_skus = pd.Index(df["sku"].unique()).difference(self.product_ids.index)
+
+        if new_stores.empty and new_skus.empty:
+            return
+
+        Store.objects.bulk_create(
+            [Store(name=name, location="Auto Imported") for name in new_stores],
+            ignore_conflicts=True,
+        )
+        Product.objects.bulk_create(
+            [Product(sku=sku, name=sku, category="Imported") for sku in new_skus],
+            ignore_conflicts=True,
+        )
+        self.load_maps()
+
+    def resolve(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Attach store/product primary keys and unit price to a chunk."""
+        self.ensure_keys(df)
+
+        df = df.assign(
+            store_pk=df["store_id"].map(self.store_ids),
+            product_pk=df["sku"].map(self.product_ids),
+        )
+        df = df[df["store_pk"].notna() & df["product_pk"].notna()]
+        return df.assign(unit_price=df["sku"].map(self.product_prices))
+
+    def build_transactions(self, df: pd.DataFrame) -> list:
+        return [
+            Transaction(
+                store_id=store_pk,
+                product_id=product_pk,
+                date=day,
+                quantity_sold=qty,
+                unit_price=price,
+                imported=True,
+            )
+            for store_pk, product_pk, day, qty, price in zip(
+                df["store_pk"].astype("int64").tolist(),
+                df["product_pk"].astype("int64").tolist(),
+                df["date"].dt.date.tolist(),
+                df["quantity_sold"].tolist(),
+                df["unit_price"].tolist(),
+            )
+        ]
+
+    def import_chunk(self, df: pd.DataFrame) -> int:
+        """Insert one normalized chunk. Returns the number of rows written."""
+        df = self.resolve(df)
+        if df.empty:
+            return 0
+
+        with transaction.atomic():
+            Transaction.objects.bulk_create(
+                self.build_transactions(df), batch_size=self.batch_size
+            )
+            rollup_service.add_frame(df)
+        return len(df)
+
+    def existing_rows(self, days: list) -> pd.DataFrame:
+        """Imported transactions on `days`; rows entered through the API are never rewritten."""
+        rows = Transaction.objects.filter(date__in=days, imported=True).values_list(
+            "id", "store_id", "product_id", "date", "quantity_sold"
+        )
+        existing = pd.DataFrame.from_records(
+            list(rows), columns=["id", "store_pk", "product_pk", "date", "quantity_sold"]
+        )
+        existing["date"] = pd.to_datetime(existing["date"])
+        return existing
+
+    def upsert_chunk(self, df: pd.DataFrame) -> dict:
+        """
+        Write a normalized chunk keyed on (store, product, date).
+
+        Days whose content hash matches the last import are skipped without
+        touching Transaction; for the rest only keys that are new or whose
+        quantity changed are (re)written. Only imported rows are compared
+        and replaced. Each day must arrive whole, in one chunk
+        (see align_chunks_by_date).
+        """
+        stats = {"inserted": 0, "updated": 0, "unchanged": 0, "skipped_days": 0}
+
+        df = aggregate_days(df)
+        hashes = day_hashes(df)
+        days = [ts.date() for ts in hashes.index]
+        stored = dict(
+            SalesChunkHash.objects.filter(date__in=days).values_list("date", "content_hash")
+        )
+        changed = [ts for ts, digest in hashes.items() if stored.get(ts.date()) != digest]
+        stats["skipped_days"] = len(hashes) - len(changed)
+
+        if not changed:
+            return stats
+
+        df = self.resolve(df[df["date"].isin(changed)])
+        existing = self.existing_rows([ts.date() for ts in changed])
+
+        current = existing.groupby(NATURAL_KEY).agg(
+            current_qty=("quantity_sold", "sum"),
+            current_rows=("id", "size"),
+        )
+        df = df.astype({"store_pk": "int64", "product_pk": "int64"}).merge(
+            current, left_on=NATURAL_KEY, right_index=True, how="left"
+        )
+
+        is_new = df["current_rows"].isna()
+        is_changed = ~is_new & (
+            (df["current_qty"] != df["quantity_sold"]) | (df["current_rows"] > 1)
+        )
+        stats["inserted"] = int(is_new.sum())
+        stats["updated"] = int(is_changed.sum())
+        stats["unchanged"] = int((~is_new & ~is_changed).sum())
+
+        stale_ids = existing.merge(
+            df.loc[is_changed, NATURAL_KEY], on=NATURAL_KEY
+        )["id"].tolist()
+
+        with transaction.atomic():
+            for start in range(0, len(stale_ids), self.batch_size):
+                Transaction.objects.filter(
+                    id__in=stale_ids[start:start + self.batch_size]
+                ).delete(rollup=False)  # rebuilt below
+
+            Transaction.objects.bulk_create(
+                self.build_transactions(df[is_new | is_changed]),
+                batch_size=self.batch_size,
+            )
+
+            # Changed days are rewritten wholesale, so recompute their rollup rows
+            rollup_service.rebuild(days=[ts.date() for ts in changed])
+
+            counts = df.groupby("date").size()
+            bulk_upsert(
+                SalesChunkHash,
+                [
+                    SalesChunkHash(
+                        date=ts.date(),
+                        content_hash=hashes[ts],
+                        row_count=int(counts.get(ts, 0)),
+                    )
+                    for ts in changed
+                ],
+                unique_fields=["date"],
+                update_fields=["content_hash", "row_count", "updated_at"],
+            )
+
+        return stats
@@ -0,0 +1,225 @@
+"""
+Background jobs: a DB-backed queue (the Job model) plus a registry of
+handlers, run by `manage.py run_jobs`.
+
+    job, merged = enqueue("retrain")   # from a view; returns immediately
+    describe(job)                      # status payload for the API
+
+Submitting a job identical (same kind and params) to one that is still
+queued or running returns that job instead of queueing another.
+"""
+import hashlib
+import io
+import json
+import re
+import time
+import traceback
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+from .snapshot_service import build_snapshot
+
+# --------------------------------------------------
+# Settings
+# --------------------------------------------------
+PROGRESS_WRITE_INTERVAL = 1.0  # seconds between progress writes to the Job row
+HANDLERS = {}
+
+
+def handler(kind: str):
+    """Register a job handler: fn(ctx, **params) -> JSON-serializable result."""
+    def register(fn):
+        HANDLERS[kind] = fn
+        return fn
+    return register
+
+
+# --------------------------------------------------
+# Submitting
+# --------------------------------------------------
+def active_key(kind: str, params: dict) -> str:
+    key = f"{kind}:{json.dumps(params, sort_keys=True, separators=(',', ':'))}"
+    if len(key) > Job._meta.get_field("active_key").max_length:
+        key = f"{kind}:sha1:{hashlib.sha1(key.encode()).hexdigest()}"  # e.g. a long csv path
+    return key
+
+
+def enqueue(kind: str, params: dict | None = None):
+    """
+    Queue a job, or join the identical one already queued/running.
+    Returns (job, merged).
+    """
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+
+    params = params or {}
+    key = active_key(kind, params)
+
+    for _ in range(3):
+        existing = Job.objects.filter(active_key=key).first()
+        if existing:
+            Job.objects.filter(pk=existing.pk).update(merged_requests=F("merged_requests") + 1)
+            return existing, True
+        try:
+            with transaction.atomic():
+                return Job.objects.create(kind=kind, params=params, active_key=key), False
+        except IntegrityError:
+            continue  # created concurrently (or finished in between): look again
+
+    raise RuntimeError(f"Could not enqueue {key}")
+
+
+def describe(job: Job) -> dict:
+    return {
+        "job_id": job.pk,
+        "kind": job.kind,
+        "params": job.params,
+        "status": job.status,
+        "progress": round(job.progress, 4),
+        "message": job.message,
+        "stages": job.stages,
+        "result": job.result,
+        "error": job.error.strip().splitlines()[-1] if job.error else None,
+        "merged_requests": job.merged_requests,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+
+
+# --------------------------------------------------
+# Running
+# --------------------------------------------------
+class JobContext:
+    """Handed to handlers to report progress and time their stages."""
+
+    def __init__(self, job: Job):
+        self.job = job
+        self.stages = []
+        self._last_write = 0.0
+
+    def progress(self, fraction: float, message: str = "", force: bool = False):
+        self.job.progress = max(0.0, min(1.0, fraction))
+        if message:
+            self.job.message = message[:255]
+
+        now = time.monotonic()
+        if force or now - self._last_write >= PROGRESS_WRITE_INTERVAL:
+            self._last_write = now
+            self._save()
+
+    @contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        self.job.message = name
+        self._save()
+        try:
+            yield
+        finally:
+            self.stages.append({"name": name, "seconds": round(time.perf_counter() - started, 3)})
+            self._save()
+
+    def _save(self):
+        Job.objects.filter(pk=self.job.pk).update(
+            progress=self.job.progress,
+            message=self.job.message,
+            stages=self.stages,
+            heartbeat_at=timezone.now(),
+        )
+
+
+def claim_next():
+    """Mark the oldest queued job as running and return it (None if the queue is empty)."""
+    with transaction.atomic():
+        job = (
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status="queued")
+            .order_by("created_at", "pk")
+            .first()
+        )
+        if job is None:
+            return None
+
+        now = timezone.now()
+        job.status, job.started_at, job.heartbeat_at = "running", now, now
+        job.save(update_fields=["status", "started_at", "heartbeat_at"])
+        return job
+
+
+def run_job(job: Job) -> Job:
+    ctx = JobContext(job)
+    try:
+        result = HANDLERS[job.kind](ctx, **job.params)
+        job.status, job.progress, job.result, job.message = "succeeded", 1.0, result, "done"
+    except Exception as e:
+        job.status, job.error, job.message = "failed", traceback.format_exc(), str(e)[:255]
+
+    job.stages = ctx.stages
+    job.active_key = None
+    job.finished_at = timezone.now()
+    job.save(update_fields=[
+        "status", "progress", "message", "result", "error", "stages", "active_key", "finished_at",
+    ])
+    return job
+
+
+def requeue_stale(older_than_seconds: int) -> int:
+    """Put running jobs whose worker stopped reporting back in the queue."""
+    cutoff = timezone.now() - timedelta(seconds=older_than_seconds)
+    return Job.objects.filter(status="running", heartbeat_at__lt=cutoff).update(
+        status="queued", started_at=None, progress=0, message="requeued"
+    )
+
+
+# --------------------------------------------------
+# Handlers
+# --------------------------------------------------
+class _ProgressOutput(io.StringIO):
+    """
+    Command stdout that turns "Processing SKU" lines into job progress,
+    out of the total announced by train_models' "Scheduled N SKUs" line.
+    """
+    SCHEDULED = re.compile(r"Scheduled (\d+) SKUs")
+
+    def __init__(self, ctx: JobContext):
+        super().__init__()
+        self.ctx, self.total, self.done = ctx, 1, 0
+
+    def write(self, text):
+        scheduled = self.SCHEDULED.match(text)
+        if scheduled:
+            self.total = max(1, int(scheduled.group(1)))
+        elif text.startswith("Processing SKU"):
+            self.done += 1
+            self.ctx.progress(self.done / self.total, text.strip())
+        return super().write(text)
+
+
+@handler("retrain")
+def retrain(ctx: JobContext, **params):
+    with ctx.stage("train_models"):
+        output = _ProgressOutput(ctx)
+        call_command("train_models", force=True, workers=settings.ML_TRAIN_WORKERS, stdout=output)
+    return {"skus_processed": output.done}
+
+
+@handler("generate_reorders")
+def generate_reorders(ctx: JobContext, **params):
+    with ctx.stage("generate_reorders"):
+        output = io.StringIO()
+        call_command("generate_reorders", stdout=output)
+    return {"predicted": output.getvalue().count(" - Predicted ")}
+
+
+@handler("reorder_snapshot")
+def reorder_snapshot(ctx: JobContext, store_id=None, csv_path=""):
+    with ctx.stage("build_snapshot"):
+        snapshot = build_snapshot(store_id, csv_path)
+    return {"snapshot_id": snapshot.pk, "rows": snapshot.row_count}
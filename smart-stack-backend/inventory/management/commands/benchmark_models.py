@@ -0,0 +1,89 @@
+import time
+
+import numpy as np
+import pandas as pd
+from django.core.management.base import BaseCommand
+from inventory.feature_service import iter_training_frames
+from inventory.models import Product
+from inventory.trainer import (
+    FEATURES, GLOBAL_FEATURES, add_catalog_codes, catalog_codes,
+    train_global_model, train_sku_model,
+)
+
+
+def holdout_metrics(y: np.ndarray, preds: np.ndarray) -> dict:
+    errors = preds - y
+    return {
+        "mae": float(np.abs(errors).mean()),
+        "rmse": float(np.sqrt((errors ** 2).mean())),
+        # Scale-free, so high-volume SKUs don't hide the small ones
+        "wape": float(np.abs(errors).sum() / max(np.abs(y).sum(), 1e-9)),
+    }
+
+
+class Command(BaseCommand):
+    help = "Compare per-SKU and global models: train time, predict time and holdout accuracy."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--n-estimators", type=int, default=100)
+        parser.add_argument("--min-days", type=int, default=30)
+        parser.add_argument("--test-days", type=int, default=28, help="Trailing days per SKU held out for scoring.")
+        parser.add_argument("--limit", type=int, default=0, help="Benchmark at most N SKUs.")
+
+    def handle(self, *args, **options):
+        n_estimators = options["n_estimators"]
+        min_days = options["min_days"]
+        test_days = options["test_days"]
+        limit = options["limit"]
+
+        # Same SKUs in both modes: those per-SKU training would accept
+        catalog, train, test = {}, [], []
+        for p, df in iter_training_frames(Product.objects.all()):
+            if df is None or len(df) < min_days + test_days or df["qty"].iloc[:-test_days].std() == 0:
+                continue
+            catalog[p.sku] = p.category
+            train.append(df.iloc[:-test_days].assign(sku=p.sku))
+            test.append(df.iloc[-test_days:].assign(sku=p.sku))
+            if limit and len(catalog) >= limit:
+                break
+
+        if not catalog:
+            self.stdout.write("No trainable SKUs found. Run import_sales first.")
+            return
+
+        self.stdout.write(
+            f"Benchmarking {len(catalog)} SKUs, n_estimators={n_estimators}, "
+            f"holdout={test_days} days per SKU"
+        )
+        y_test = pd.concat(test)["qty"].to_numpy(dtype=float)
+        results = {}
+
+        # Per-SKU: one fit and one predict call per SKU
+        started = time.perf_counter()
+        sku_models = [train_sku_model(df, n_estimators)[0] for df in train]
+        train_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        preds = np.concatenate([model.predict(df[FEATURES]) for model, df in zip(sku_models, test)])
+        predict_seconds = time.perf_counter() - started
+        results["per-sku"] = (train_seconds, predict_seconds, holdout_metrics(y_test, preds))
+
+        # Global: one fit, one predict call for every SKU
+        started = time.perf_counter()
+        global_model = train_global_model(pd.concat(train), catalog, n_estimators)[0]
+        train_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        test_frame = add_catalog_codes(pd.concat(test), *catalog_codes(catalog))
+        preds = global_model.predict(test_frame[GLOBAL_FEATURES])
+        predict_seconds = time.perf_counter() - started
+        results["global"] = (train_seconds, predict_seconds, holdout_metrics(y_test, preds))
+
+        self.stdout.write(
+            f"{'mode':>8} {'train s':>9} {'predict s':>10} {'MAE':>10} {'RMSE':>10} {'WAPE':>7}"
+        )
+        for mode, (train_seconds, predict_seconds, metrics) in results.items():
+            self.stdout.write(
+                f"{mode:>8} {train_seconds:>9.2f} {predict_seconds:>10.3f} "
+                f"{metrics['mae']:>10.2f} {metrics['rmse']:>10.2f} {metrics['wape']:>6.1%}"
+            )
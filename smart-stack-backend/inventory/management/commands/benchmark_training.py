@@ -0,0 +1,76 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from inventory.feature_service import iter_training_frames
+from inventory.models import Product
+from inventory.trainer import train_sku_model
+
+
+def train_all(frames, n_estimators, workers):
+    """Fit every frame once; nothing is written to disk."""
+    if workers <= 1:
+        for df in frames:
+            train_sku_model(df, n_estimators, 1)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(
+            train_sku_model,
+            frames,
+            [n_estimators] * len(frames),
+            [1] * len(frames),
+            chunksize=max(1, len(frames) // (workers * 4)),
+        ))
+
+
+class Command(BaseCommand):
+    help = "Benchmark per-SKU training throughput (SKUs/sec) across worker counts."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers", default="",
+            help="Comma-separated worker counts (default: 1,2,4,... up to CPU count)."
+        )
+        parser.add_argument("--n-estimators", type=int, default=100)
+        parser.add_argument("--min-days", type=int, default=30)
+        parser.add_argument("--limit", type=int, default=0, help="Benchmark at most N SKUs.")
+
+    def handle(self, *args, **options):
+        n_estimators = options["n_estimators"]
+        min_days = options["min_days"]
+        limit = options["limit"]
+
+        if options["workers"]:
+            worker_counts = [int(w) for w in options["workers"].split(",")]
+        else:
+            cpus = os.cpu_count() or 1
+            worker_counts = [1]
+            while worker_counts[-1] * 2 <= cpus:
+                worker_counts.append(worker_counts[-1] * 2)
+
+        frames = [
+            df for _, df in iter_training_frames(Product.objects.all())
+            if df is not None and len(df) >= min_days and df["qty"].std() > 0
+        ]
+        if limit > 0:
+            frames = frames[:limit]
+
+        if not frames:
+            self.stdout.write("No trainable SKUs found. Run import_sales first.")
+            return
+
+        self.stdout.write(f"Benchmarking {len(frames)} SKUs, n_estimators={n_estimators}")
+        self.stdout.write(f"{'workers':>8} {'seconds':>10} {'SKUs/sec':>10} {'speedup':>8}")
+
+        baseline = None
+        for workers in worker_counts:
+            started = time.perf_counter()
+            train_all(frames, n_estimators, workers)
+            elapsed = time.perf_counter() - started
+
+            baseline = baseline or elapsed
+            self.stdout.write(
+                f"{workers:>8} {elapsed:>10.2f} {len(frames) / elapsed:>10.1f} {baseline / elapsed:>7.2f}x"
+            )
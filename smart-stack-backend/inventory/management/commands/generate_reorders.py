@@ -1,62 +1,68 @@
-import os 
-import joblib
 import pandas as pd
 from pathlib import Path
-from django.utils import timezone
 from django.core.management.base import BaseCommand
-from inventory.models import Product, Transaction, ReorderPrediction
+from inventory.feature_service import load_latest_features
+from inventory.ml_service import load_global_model, model_cache, predict_global, predict_many
+from inventory.model_store import model_key
+from inventory.models import Product, ReorderPrediction
+from inventory.trainer import FEATURES
+from inventory.utils import bulk_upsert
 
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
-MODEL_DIR = BASE_DIR / "models"
+WRITE_BATCH_SIZE = 1000
 
 class Command(BaseCommand):
     help = "Generate reorder quantities using trained XGBoost models"
 
     def handle(self, *args, **options):
-        predictions = []
+        products = list(Product.objects.values_list("id", "sku"))
 
-        for p in Product.objects.all():
-            safe_sku = "".join([c if c.isalnum() else "_" for c in p.sku])
-            model_path = MODEL_DIR / f"{safe_sku}.joblib"
+        # Next-day lag features for every SKU from daily totals
+        features = load_latest_features()
 
-            if not model_path.exists():
-                self.stdout.write(f" - No model for SKU {p.sku}, skipping")
-                continue
+        # ML_MODEL_MODE=global: every SKU goes through the one global model
+        global_model = load_global_model()
 
-            model = joblib.load(model_path)
+        scored, models = [], []
+        for product_id, sku in products:
+            model = global_model or model_cache.get(model_key(sku))
 
-            # Last 7 days transactions
-            last_tx = p.transactions.order_by('-date')[:7]
-            if not last_tx:
-                self.stdout.write(f" - No recent transactions for SKU {p.sku}, skipping")
+            if model is None:
+                self.stdout.write(f" - No model for SKU {sku}, skipping")
                 continue
 
-            qty_list = [tx.quantity_sold for tx in reversed(last_tx)]
-            while len(qty_list) < 7:
-                qty_list.insert(0, 0)
-
-            dow = last_tx[0].date.weekday()  # day of week for last date
-            X_new = pd.DataFrame([[qty_list[-1], qty_list[-7], dow]],
-                                 columns=["lag1", "lag7", "dow"])
+            if product_id not in features.index:
+                self.stdout.write(f" - No recent transactions for SKU {sku}, skipping")
+                continue
 
-            pred = model.predict(X_new)[0]
-            pred_qty = max(0, round(pred))
+            scored.append((product_id, sku))
+            models.append(model)
 
-            predictions.append({
-                "sku": p.sku,
-                "predicted_qty": pred_qty
-            })
+        # Every SKU's forecast in one batched tree evaluation
+        predictions = []
+        if scored:
+            X_new = features.loc[[pid for pid, _ in scored], FEATURES].to_numpy(dtype=float)
+            if global_model:
+                preds = predict_global(global_model, [sku for _, sku in scored], X_new)
+            else:
+                preds = predict_many(models, X_new)
 
-            # Save prediction to DB
-            ReorderPrediction.objects.update_or_create(
-                sku=p.sku,
-                defaults={
-                    "predicted_qty": pred_qty,
-                    "generated_at": timezone.now()
-                }
-            )
+            for (_, sku), pred in zip(scored, preds):
+                pred = float(pred)
+                predictions.append({
+                    "sku": sku,
+                    "predicted_qty": max(0, round(pred))
+                })
+                self.stdout.write(f" - Predicted {pred:.2f} for SKU {sku}")
 
-            self.stdout.write(f" - Predicted {pred:.2f} for SKU {p.sku}")
+        # Save all predictions to DB in one bulk upsert
+        bulk_upsert(
+            ReorderPrediction,
+            [ReorderPrediction(**row) for row in predictions],
+            unique_fields=["sku"],
+            update_fields=["predicted_qty", "generated_at"],
+            batch_size=WRITE_BATCH_SIZE,
+        )
 
         # Save CSV backup
         if predictions:
@@ -1,15 +1,30 @@
-import pandas as pd
-from django.core.management.base import BaseCommand
-from inventory.models import Store, Product, Transaction
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from inventory.import_service import (
+    READ_CHUNK_SIZE,
+    SalesImporter,
+    align_chunks_by_date,
+    limit_chunks,
+    read_csv_chunks,
+    read_dataset_chunks,
+)
 from tqdm import tqdm
 
 try:
-    from datasets import load_dataset
+    from datasets import Dataset, load_dataset, load_from_disk
 except ImportError:
-    load_dataset = None
+    Dataset = load_dataset = load_from_disk = None
 
 
-CHUNK_SIZE = 5000
+def open_arrow_dataset(path: str):
+    """Open a save_to_disk() directory or a single .arrow file without network access."""
+    if Path(path).is_file():
+        return Dataset.from_file(path)
+
+    dataset = load_from_disk(path)
+    if isinstance(dataset, dict):  # DatasetDict
+        dataset = dataset["train"]
+    return dataset
 
 
 class Command(BaseCommand):
@@ -26,119 +41,90 @@ class Command(BaseCommand):
             default="",
             help="Optional local CSV file path",
         )
+        parser.add_argument(
+            "--arrow",
+            default="",
+            help="Optional local Arrow dataset (save_to_disk directory or .arrow file)",
+        )
         parser.add_argument(
             "--limit",
             type=int,
             default=0,
             help="Limit number of rows (for testing)",
         )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=READ_CHUNK_SIZE,
+            help="Rows read and imported per chunk",
+        )
+        parser.add_argument(
+            "--upsert",
+            action="store_true",
+            help="Upsert on (store, product, date) and skip days unchanged since the last import",
+        )
 
     def handle(self, *args, **options):
         hf_id = options["hf_id"]
         csv_path = options["csv"]
+        arrow_path = options["arrow"]
         limit = options["limit"]
+        chunk_size = options["chunk_size"]
+        upsert = options["upsert"]
 
         # --------------------------------------------------
-        # Load dataset
+        # Load dataset (as a stream of normalized chunks)
         # --------------------------------------------------
         if csv_path:
             self.stdout.write(f"📂 Loading CSV from {csv_path}")
-            df = pd.read_csv(csv_path, parse_dates=["date"])
+            chunks = read_csv_chunks(csv_path, chunk_size=chunk_size)
         else:
             if not load_dataset:
                 self.stderr.write("❌ datasets package not installed")
                 return
 
-            self.stdout.write(f"⬇ Downloading HuggingFace dataset: {hf_id}")
-            dataset = load_dataset(hf_id)
-            df = dataset["train"].to_pandas()
-            df["date"] = pd.to_datetime(df["date"], errors="coerce")
-
-        # --------------------------------------------------
-        # Normalize columns
-        # --------------------------------------------------
-        df = df.rename(columns={
-            "store_nbr": "store_id",
-            "family": "sku",
-            "sales": "quantity_sold",
-        })
-
-        df = df[["date", "store_id", "sku", "quantity_sold"]]
-        df["quantity_sold"] = df["quantity_sold"].fillna(0).astype(int)
-
-        if limit > 0:
-            df = df.head(limit)
+            if arrow_path:
+                self.stdout.write(f"📂 Loading Arrow dataset from {arrow_path}")
+                dataset = open_arrow_dataset(arrow_path)
+            else:
+                # Served from the local cache when already downloaded
+                # (set HF_DATASETS_OFFLINE=1 to never touch the network).
+                self.stdout.write(f"⬇ Loading HuggingFace dataset: {hf_id}")
+                dataset = load_dataset(hf_id, split="train")
 
-        self.stdout.write(f"📊 Rows to import: {len(df)}")
+            chunks = read_dataset_chunks(dataset, chunk_size=chunk_size, limit=limit)
 
         # --------------------------------------------------
-        # Stores
+        # Stores, Products & Transactions (chunk by chunk)
         # --------------------------------------------------
-        store_ids = df["store_id"].astype(int).unique()
-        existing_stores = {s.name: s for s in Store.objects.all()}
-
-        new_stores = [
-            Store(name=str(sid), location="Auto Imported")
-            for sid in store_ids
-            if str(sid) not in existing_stores
-        ]
-
-        Store.objects.bulk_create(new_stores, ignore_conflicts=True)
-        store_map = {s.name: s for s in Store.objects.all()}
-
-        # --------------------------------------------------
-        # Products
-        # --------------------------------------------------
-        skus = df["sku"].astype(str).unique()
-        existing_products = {p.sku: p for p in Product.objects.all()}
-
-        new_products = [
-            Product(
-                sku=sku,
-                name=sku,
-                category="Imported",
-            )
-            for sku in skus
-            if sku not in existing_products
-        ]
-
-        Product.objects.bulk_create(new_products, ignore_conflicts=True)
-        product_map = {p.sku: p for p in Product.objects.all()}
-
-        # --------------------------------------------------
-        # Transactions
-        # --------------------------------------------------
-        transactions = []
-        pbar = tqdm(total=len(df), desc="🧾 Importing Transactions")
-
-        for _, row in df.iterrows():
-            store = store_map.get(str(int(row["store_id"])))
-            product = product_map.get(str(row["sku"]))
-
-            if not store or not product:
-                pbar.update(1)
-                continue
-
-            transactions.append(
-                Transaction(
-                    store=store,
-                    product=product,
-                    date=row["date"].date(),
-                    quantity_sold=int(row["quantity_sold"]),
-                    unit_price=product.unit_price,
-                )
+        importer = SalesImporter()
+        chunks = limit_chunks(chunks, limit)
+        pbar = tqdm(total=limit or None, desc="🧾 Importing Transactions", unit="rows")
+
+        if upsert:
+            totals = {"inserted": 0, "updated": 0, "unchanged": 0, "skipped_days": 0}
+            try:
+                for chunk in align_chunks_by_date(chunks):
+                    for key, value in importer.upsert_chunk(chunk).items():
+                        totals[key] += value
+                    pbar.update(len(chunk))
+            except ValueError as e:
+                raise CommandError(str(e))
+            finally:
+                pbar.close()
+
+            self.stdout.write(
+                f"📊 Inserted: {totals['inserted']} | Updated: {totals['updated']} | "
+                f"Unchanged: {totals['unchanged']} | Days skipped: {totals['skipped_days']}"
             )
+        else:
+            imported = 0
+            for chunk in chunks:
+                imported += importer.import_chunk(chunk)
+                pbar.update(len(chunk))
+            pbar.close()
 
-            if len(transactions) >= CHUNK_SIZE:
-                Transaction.objects.bulk_create(transactions)
-                transactions.clear()
-
-            pbar.update(1)
-
-        if transactions:
-            Transaction.objects.bulk_create(transactions)
-
-        pbar.close()
+            self.stdout.write(f"📊 Rows imported: {imported}")
 
         self.stdout.write(
             self.style.SUCCESS("✅ Sales data imported successfully")
@@ -0,0 +1,52 @@
+import joblib
+from django.core.management.base import BaseCommand
+from inventory.ml_service import MODEL_DIR, model_store
+
+
+class Command(BaseCommand):
+    help = "Pack per-SKU .joblib models into the packed model store."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--delete-joblib", action="store_true",
+            help="Remove each .joblib file once its model is in the store."
+        )
+        parser.add_argument(
+            "--force", action="store_true",
+            help="Overwrite models already in the store (by default they are newer)."
+        )
+        parser.add_argument(
+            "--compact", action="store_true",
+            help="Rewrite the store's data file without superseded models."
+        )
+
+    def handle(self, *args, **options):
+        packed = []
+
+        with model_store.writer() as writer:
+            for path in sorted(MODEL_DIR.glob("*.joblib")):
+                if path.stem in model_store and not options["force"]:
+                    self.stdout.write(f" - {path.stem} already packed, skipping")
+                    continue
+
+                try:
+                    model = joblib.load(path)
+                    raw = model.get_booster().save_raw("json")
+                except Exception as e:
+                    self.stderr.write(f" - could not read {path.name}: {e}")
+                    continue
+
+                writer.put(path.stem, bytes(raw))
+                packed.append(path)
+                self.stdout.write(f" - packed {path.stem}")
+
+        if options["delete_joblib"]:
+            for path in packed:
+                path.unlink()
+
+        if options["compact"]:
+            model_store.compact()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(packed)} models packed into {model_store.root} ({len(model_store.keys())} total)."
+        ))
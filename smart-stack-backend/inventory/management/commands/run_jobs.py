@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+from inventory.jobs import claim_next, requeue_stale, run_job
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs (retraining, reorder generation, ...)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Exit when the queue is empty.")
+        parser.add_argument("--poll-interval", type=float, default=2.0, help="Seconds to sleep when idle.")
+        parser.add_argument("--max-jobs", type=int, default=0, help="Exit after N jobs (0 = no limit).")
+        parser.add_argument(
+            "--stale-after", type=int, default=3600,
+            help="Requeue running jobs with no progress for this many seconds (left by a dead worker)."
+        )
+
+    def handle(self, *args, **options):
+        requeued = requeue_stale(options["stale_after"])
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} stale job(s)")
+
+        processed = 0
+        while not options["max_jobs"] or processed < options["max_jobs"]:
+            job = claim_next()
+            if job is None:
+                if options["once"]:
+                    break
+                time.sleep(options["poll_interval"])
+                continue
+
+            self.stdout.write(f"Running job #{job.pk} ({job.kind})")
+            job = run_job(job)
+            processed += 1
+
+            timings = ", ".join(f"{s['name']} {s['seconds']:.1f}s" for s in job.stages)
+            style = self.style.SUCCESS if job.status == "succeeded" else self.style.ERROR
+            self.stdout.write(style(f" - #{job.pk} {job.status} ({timings})"))
+
+        self.stdout.write(f"Processed {processed} job(s)")
@@ -2,37 +2,99 @@
 
 import os
 import datetime
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from pathlib import Path
-import math
 import pandas as pd
 import joblib
 from django.core.management.base import BaseCommand
-from django.db.models import Sum
-from inventory.models import Product, Transaction
-from xgboost import XGBRegressor, plot_importance
-
-# --- Helper: safe filename ---
-def sanitize_filename(name: str):
-    return "".join([c if c.isalnum() else "_" for c in name])
+from inventory.feature_service import iter_training_frames, load_sales_watermarks
+from inventory.ml_service import model_store
+from inventory.model_store import GLOBAL_MODEL_KEY, model_key
+from inventory.models import Product, TrainingWatermark
+from inventory.trainer import fit_sku, train_global_model
+from xgboost import plot_importance
 
 # --- Directories ---
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 MODEL_DIR = BASE_DIR / "models"
 LOG_FILE = MODEL_DIR / "training_logs.csv"
+LOG_COLUMNS = ["timestamp","sku","days_used","mae","rmse","model_path","mode","fit_seconds","seconds_saved"]
+SAVE_BATCH_SIZE = 50  # trained models buffered per model-store write (the writer lock is held only then)
 MODEL_DIR.mkdir(exist_ok=True)
 
+# --- Training log ---
+def ensure_log_file():
+    """Create the log, or add columns introduced since an older log was written."""
+    if not LOG_FILE.exists():
+        pd.DataFrame(columns=LOG_COLUMNS).to_csv(LOG_FILE, index=False)
+        return
+
+    log = pd.read_csv(LOG_FILE)
+    if list(log.columns) != LOG_COLUMNS:
+        log.reindex(columns=LOG_COLUMNS).to_csv(LOG_FILE, index=False)
+
 class Command(BaseCommand):
-    help = "Train XGBRegressor per SKU using daily-aggregated transactions."
+    help = "Train XGBRegressor per SKU (or one global model) using daily-aggregated transactions."
 
     def add_arguments(self, parser):
         parser.add_argument("--min-days", type=int, default=30, help="Minimum days to train a model.")
         parser.add_argument("--n-estimators", type=int, default=100)
         parser.add_argument("--force", action="store_true", help="Overwrite existing models")
+        parser.add_argument(
+            "--workers", type=int, default=None,
+            help="Train SKUs in a pool of N processes (default 1; 0 = one per CPU core). "
+                 "With --global, XGBoost threads for the single fit (default: all cores)."
+        )
+        parser.add_argument(
+            "--full", action="store_true",
+            help="Ignore training watermarks and consider every SKU, even without new data."
+        )
+        parser.add_argument(
+            "--update", action="store_true",
+            help="Warm-start existing models on newly arrived days instead of refitting."
+        )
+        parser.add_argument(
+            "--update-rounds", type=int, default=20,
+            help="Trees added per warm-start update."
+        )
+        parser.add_argument(
+            "--min-new-days", type=int, default=7,
+            help="New days needed before a SKU is warm-start updated; fewer leaves it for a later run "
+                 "(or refits it with --force)."
+        )
+        parser.add_argument(
+            "--max-updates", type=int, default=5,
+            help="Warm-start updates allowed before a full refit is forced."
+        )
+        parser.add_argument(
+            "--global", action="store_true", dest="global_model",
+            help="Train one model across all SKUs (SKU/category as features) instead of one per SKU. "
+                 "Uses every SKU with sales, regardless of --min-days."
+        )
+
+    # --- Models: packed store, with legacy per-SKU .joblib files as fallback ---
+    @staticmethod
+    def has_model(key):
+        return key in model_store or (MODEL_DIR / f"{key}.joblib").exists()
+
+    @staticmethod
+    def model_raw(key):
+        """Saved booster as XGBoost JSON bytes (for warm starts)."""
+        raw = model_store.get_raw(key)
+        if raw is None:
+            raw = joblib.load(MODEL_DIR / f"{key}.joblib").get_booster().save_raw("json")
+        return bytes(raw)
 
     def handle(self, *args, **options):
         min_days = options["min_days"]
         n_estimators = options["n_estimators"]
         force = options["force"]
+        workers = options["workers"]
+        full = options["full"]
+        self.update = options["update"]
+        self.update_rounds = options["update_rounds"]
+        self.min_new_days = options["min_new_days"]
+        self.max_updates = options["max_updates"]
 
         products = Product.objects.all()
         if not products.exists():
@@ -40,27 +102,110 @@ class Command(BaseCommand):
             return
 
         # Create log file if not exists
-        if not LOG_FILE.exists():
-            pd.DataFrame(columns=["timestamp","sku","days_used","mae","rmse","model_path"]).to_csv(LOG_FILE, index=False)
+        ensure_log_file()
+
+        if options["global_model"]:
+            # One fit: let XGBoost use every core unless --workers says otherwise
+            self.train_global(products, n_estimators, workers or None)
+            self.stdout.write(self.style.SUCCESS("Training complete. Logs saved."))
+            return
+
+        self.watermarks = watermarks = load_sales_watermarks()
+        self.trained = {w.product_id: w for w in TrainingWatermark.objects.all()}
+        if workers is None:
+            workers = 1
+        elif workers == 0:
+            workers = os.cpu_count() or 1
+        if not full:
+            products = self.changed_products(products, watermarks)
+        # One "Processing SKU" line follows per SKU; the retrain job reads this as its progress total
+        self.stdout.write(f"Scheduled {len(products)} SKUs")
+
+        jobs = self.training_jobs(products, min_days, force)
+
+        # Models are written in batches so other writers (the retrain job,
+        # pack_models) only wait for a batch to be appended, not for training
+        self.pending = []
+        try:
+            if workers > 1:
+                self.stdout.write(f"Training with {workers} worker processes")
+                self.train_parallel(jobs, n_estimators, workers)
+            else:
+                for p, df, key, since in jobs:
+                    raw = self.model_raw(key) if since else None
+                    result = fit_sku(df, n_estimators, since, raw, self.update_rounds)
+                    self.save_model(p, len(df), key, since, *result)
+        finally:
+            self.flush_models()  # even on error, so finished models are never lost
+
+        self.stdout.write(self.style.SUCCESS("Training complete. Logs saved."))
+
+    def train_global(self, products, n_estimators, workers):
+        """Fit the single all-SKU model; `workers` become XGBoost threads (None = all cores)."""
+        catalog, frames = {}, []
+        for p, df in iter_training_frames(products):
+            catalog[p.sku] = p.category
+            if df is not None:
+                frames.append(df.assign(sku=p.sku))
+
+        if not frames:
+            self.stdout.write("No transactions found. Run import_sales first.")
+            return
+
+        df = pd.concat(frames)
+        self.stdout.write(f"Training global model on {len(frames)} SKUs, {len(df)} daily rows")
+        model, mae, rmse, fit_seconds = train_global_model(df, catalog, n_estimators, workers)
+
+        with model_store.writer() as writer:
+            writer.put(GLOBAL_MODEL_KEY, bytes(model.get_booster().save_raw("json")))
+        self.stdout.write(self.style.SUCCESS(
+            f" - Global model saved ({fit_seconds:.2f}s) | MAE={mae:.2f} | RMSE={rmse:.2f}"
+        ))
+
+        log_row = {
+            "timestamp": datetime.datetime.now().isoformat(),
+            "sku": "*",
+            "days_used": len(df),
+            "mae": round(mae, 4),
+            "rmse": round(rmse, 4),
+            "model_path": model_store.location(GLOBAL_MODEL_KEY),
+            "mode": "global",
+            "fit_seconds": round(fit_seconds, 4),
+            "seconds_saved": None,
+        }
+        pd.DataFrame([log_row], columns=LOG_COLUMNS).to_csv(LOG_FILE, mode="a", header=False, index=False)
+
+    def changed_products(self, products, watermarks):
+        """Drop SKUs whose model was trained on exactly the data they have now."""
+        changed = []
 
         for p in products:
+            mark = self.trained.get(p.id)
+            current = watermarks.get(p.id)
+            if mark and current and mark.matches(*current) and self.has_model(model_key(p.sku)):
+                continue
+            changed.append(p)
+
+        skipped = len(products) - len(changed)
+        if skipped:
+            self.stdout.write(f"Skipping {skipped} SKUs with no new data since last training (use --full to include them)")
+        return changed
+
+    def training_jobs(self, products, min_days, force):
+        """
+        Yield (product, frame, model key, since) for every SKU that should be
+        (re)trained. `since` is the watermark date to warm-start from, or None
+        for a full refit.
+        """
+        for p, df in iter_training_frames(products):
             sku = p.sku
-            safe_sku = sanitize_filename(sku)
+            key = model_key(sku)
             self.stdout.write(f"Processing SKU: {sku}")
 
-            qs = (Transaction.objects.filter(product=p)
-                  .values("date")
-                  .annotate(qty=Sum("quantity_sold"))
-                  .order_by("date"))
-
-            if not qs:
+            if df is None:
                 self.stdout.write(f" - no transactions for {sku}, skipping")
                 continue
 
-            df = pd.DataFrame(list(qs))
-            df["date"] = pd.to_datetime(df["date"])
-            df = df.set_index("date").resample("D").sum().fillna(0)
-
             if len(df) < min_days:
                 self.stdout.write(f" - only {len(df)} days; need {min_days}, skipping")
                 continue
@@ -70,53 +215,122 @@ class Command(BaseCommand):
                 self.stdout.write(f" - SKU {sku} has no variance in qty, skipping")
                 continue
 
-            # Feature engineering
-            df["lag1"] = df["qty"].shift(1).fillna(0)
-            df["lag7"] = df["qty"].shift(7).fillna(0)
-            df["dow"] = df.index.dayofweek
-            df = df.dropna()
-
-            X = df[["lag1", "lag7", "dow"]]
-            y = df["qty"]
-
-            model = XGBRegressor(
-                n_estimators=n_estimators,
-                learning_rate=0.1,
-                max_depth=6,
-                subsample=0.9,
-                colsample_bytree=0.9,
-                objective="reg:squarederror",
-                random_state=42,
-            )
-            model.fit(X, y)
-
-            preds = model.predict(X)
-            mae = math.fabs((y - preds).mean())
-            rmse = math.sqrt(((y - preds) ** 2).mean())
-
-            model_path = MODEL_DIR / f"{safe_sku}.joblib"
-            if model_path.exists() and not force:
-                self.stdout.write(f" - model exists at {model_path}; use --force to overwrite")
+            since = self.warm_start_date(p, df, key)
+            if since is None and self.has_model(key) and not force:
+                self.stdout.write(f" - model exists for {sku}; use --force to overwrite")
                 continue
 
-            joblib.dump(model, model_path)
-            self.stdout.write(self.style.SUCCESS(f" - Model saved for {sku} | MAE={mae:.2f} | RMSE={rmse:.2f}"))
-
-            # Feature importance plot (safe)
-            try:
-                plot_importance(model, max_num_features=20, importance_type="weight")
-            except ValueError:
-                self.stdout.write(f" - No feature importance for {sku} (all zero or no splits)")
-
-            # Log
-            log_row = {
-                "timestamp": datetime.datetime.now().isoformat(),
-                "sku": sku,
-                "days_used": len(df),
-                "mae": round(mae, 4),
-                "rmse": round(rmse, 4),
-                "model_path": str(model_path)
-            }
-            pd.DataFrame([log_row]).to_csv(LOG_FILE, mode="a", header=False, index=False)
+            yield p, df, key, since
 
-        self.stdout.write(self.style.SUCCESS("Training complete. Logs saved."))
+    def warm_start_date(self, p, df, key):
+        """
+        Date after which new days can be boosted onto the saved model, or None
+        when a full refit is needed: no model/watermark, too many updates
+        already, fewer than --min-new-days new days, or history before the
+        watermark was rewritten.
+        """
+        mark = self.trained.get(p.id)
+        if not self.update or not mark or not self.has_model(key):
+            return None
+
+        if mark.updates_since_refit >= self.max_updates:
+            self.stdout.write(f" - {mark.updates_since_refit} updates since last refit; refitting")
+            return None
+
+        since = pd.Timestamp(mark.last_date)
+        if df.index[-1] <= since or df.loc[:since, "qty"].sum() != mark.qty_total:
+            return None
+
+        new_days = int((df.index > since).sum())
+        if new_days < self.min_new_days:
+            self.stdout.write(f" - only {new_days} new day(s); need {self.min_new_days} to update")
+            return None
+
+        return mark.last_date
+
+    def train_parallel(self, jobs, n_estimators, workers):
+        """
+        Fit SKUs in a process pool (XGBoost single-threaded per worker).
+        Only the parent process writes to the model store and the log.
+        """
+        max_pending = workers * 2  # bound how many frames are held in memory
+        pending = {}
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for p, df, key, since in jobs:
+                raw = self.model_raw(key) if since else None
+                future = pool.submit(fit_sku, df, n_estimators, since, raw, self.update_rounds, 1)
+                pending[future] = (p, len(df), key, since)
+
+                if len(pending) >= max_pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        self.save_model(*pending.pop(future), *future.result())
+
+            for future in list(pending):
+                self.save_model(*pending.pop(future), *future.result())
+
+    def save_model(self, p, days_used, key, since, model, mae, rmse, fit_seconds):
+        sku = p.sku
+        mark = self.trained.get(p.id)
+        mode = "full" if since is None else "update"
+
+        # Time saved vs. the SKU's last full refit
+        seconds_saved = None
+        if mode == "update" and mark.full_fit_seconds:
+            seconds_saved = round(mark.full_fit_seconds - fit_seconds, 4)
+
+        self.stdout.write(self.style.SUCCESS(
+            f" - Model trained for {sku} ({mode}, {fit_seconds:.2f}s) | MAE={mae:.2f} | RMSE={rmse:.2f}"
+        ))
+
+        # Feature importance plot (safe)
+        try:
+            plot_importance(model, max_num_features=20, importance_type="weight")
+        except ValueError:
+            self.stdout.write(f" - No feature importance for {sku} (all zero or no splits)")
+
+        # Log
+        log_row = {
+            "timestamp": datetime.datetime.now().isoformat(),
+            "sku": sku,
+            "days_used": days_used,
+            "mae": round(mae, 4),
+            "rmse": round(rmse, 4),
+            "model_path": model_store.location(key),
+            "mode": mode,
+            "fit_seconds": round(fit_seconds, 4),
+            "seconds_saved": seconds_saved,
+        }
+        pd.DataFrame([log_row], columns=LOG_COLUMNS).to_csv(LOG_FILE, mode="a", header=False, index=False)
+
+        # Remember which data this model has seen
+        defaults = None
+        watermark = self.watermarks.get(p.id)
+        if watermark:
+            last_date, row_count, qty_total = watermark
+            defaults = {"last_date": last_date, "row_count": row_count, "qty_total": qty_total}
+            if mode == "full":
+                defaults.update(updates_since_refit=0, full_fit_seconds=fit_seconds)
+            else:
+                defaults.update(updates_since_refit=mark.updates_since_refit + 1)
+
+        self.pending.append((p, key, bytes(model.get_booster().save_raw("json")), defaults))
+        if len(self.pending) >= SAVE_BATCH_SIZE:
+            self.flush_models()
+
+    def flush_models(self):
+        """Append buffered models under the writer lock, then record their watermarks."""
+        if not self.pending:
+            return
+        pending, self.pending = self.pending, []
+
+        with model_store.writer() as writer:
+            for p, key, raw, defaults in pending:
+                writer.put(key, raw)
+        self.stdout.write(f"Saved {len(pending)} model(s)")
+
+        # Only once the models are committed, so a watermark never claims data its model lacks
+        for p, key, raw, defaults in pending:
+            if defaults is not None:
+                TrainingWatermark.objects.update_or_create(product=p, defaults=defaults)
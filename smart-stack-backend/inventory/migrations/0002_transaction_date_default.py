@@ -0,0 +1,19 @@
+# Generated by Django 6.0 on 2026-10-16 09:12
+
+import datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='transaction',
+            name='date',
+            field=models.DateField(default=datetime.date.today),
+        ),
+    ]
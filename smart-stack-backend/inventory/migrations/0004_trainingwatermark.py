@@ -0,0 +1,25 @@
+# Generated by Django 6.0 on 2026-10-17 08:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0003_saleschunkhash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrainingWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_date', models.DateField()),
+                ('row_count', models.PositiveIntegerField(default=0)),
+                ('qty_total', models.BigIntegerField(default=0)),
+                ('trained_at', models.DateTimeField(auto_now=True)),
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='training_watermark', to='inventory.product')),
+            ],
+        ),
+    ]
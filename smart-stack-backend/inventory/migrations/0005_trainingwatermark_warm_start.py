@@ -0,0 +1,23 @@
+# Generated by Django 6.0 on 2026-10-17 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0004_trainingwatermark'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trainingwatermark',
+            name='full_fit_seconds',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='trainingwatermark',
+            name='updates_since_refit',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
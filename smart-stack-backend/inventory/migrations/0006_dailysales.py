@@ -0,0 +1,55 @@
+# Generated by Django 6.0 on 2026-10-17 14:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import DecimalField, F, Sum
+
+
+def backfill_daily_sales(apps, schema_editor):
+    Transaction = apps.get_model("inventory", "Transaction")
+    DailySales = apps.get_model("inventory", "DailySales")
+
+    rows = (
+        Transaction.objects
+        .values_list("store_id", "product_id", "date")
+        .annotate(
+            qty=Sum("quantity_sold"),
+            revenue=Sum(F("quantity_sold") * F("unit_price"), output_field=DecimalField(max_digits=14, decimal_places=2)),
+        )
+        .order_by()
+    )
+
+    batch = []
+    for store_id, product_id, day, qty, revenue in rows.iterator(chunk_size=20_000):
+        batch.append(DailySales(store_id=store_id, product_id=product_id, date=day, qty=qty or 0, revenue=revenue or 0))
+        if len(batch) >= 5000:
+            DailySales.objects.bulk_create(batch)
+            batch = []
+    DailySales.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0005_trainingwatermark_warm_start'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('qty', models.BigIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='inventory.product')),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='inventory.store')),
+            ],
+            options={
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['date'], name='inventory_d_date_ba03fa_idx'), models.Index(fields=['product', 'date'], name='inventory_d_product_e3c4d4_idx')],
+                'unique_together': {('store', 'product', 'date')},
+            },
+        ),
+        migrations.RunPython(backfill_daily_sales, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 6.0 on 2026-10-17 15:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0006_dailysales'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='transaction',
+            name='inventory_t_date_5e018f_idx',
+        ),
+        migrations.AddIndex(
+            model_name='stock',
+            index=models.Index(fields=['last_updated', 'id'], name='inventory_s_last_up_4d5d12_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['date', 'id'], name='inventory_t_date_6ede9e_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 6.0 on 2026-10-17 17:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0008_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReorderSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('store_id', models.PositiveIntegerField(blank=True, null=True)),
+                ('csv_path', models.CharField(blank=True, default='', max_length=255)),
+                ('generated_at', models.DateTimeField(auto_now_add=True)),
+                ('row_count', models.PositiveIntegerField(default=0)),
+                ('build_seconds', models.FloatField(default=0)),
+            ],
+            options={
+                'ordering': ['-generated_at', '-id'],
+                'indexes': [models.Index(fields=['store_id', 'csv_path', 'generated_at'], name='inventory_r_store_i_9f9a5b_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ReorderSnapshotRow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sku', models.CharField(max_length=64)),
+                ('predicted_daily_demand', models.FloatField()),
+                ('current_stock', models.IntegerField()),
+                ('recommended_reorder_qty', models.IntegerField()),
+                ('snapshot', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rows', to='inventory.reordersnapshot')),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+    ]
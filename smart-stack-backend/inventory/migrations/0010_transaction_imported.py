@@ -0,0 +1,25 @@
+# Generated by Django 6.0 on 2026-10-17 18:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0009_reorder_snapshots'),
+    ]
+
+    operations = [
+        # Existing rows were all fair game for `import_sales --upsert` until
+        # now, so they start out as imported; new rows default to False.
+        migrations.AddField(
+            model_name='transaction',
+            name='imported',
+            field=models.BooleanField(default=True, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='imported',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+    ]
@@ -1,10 +1,20 @@
+import json
 import os
+import threading
+from collections import OrderedDict
 import joblib
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
 from pathlib import Path
+from django.conf import settings
 from django.db.models import Sum
 
+from .feature_service import densify_daily
+from .model_store import GLOBAL_MODEL_KEY, ModelStore, model_key
 from .models import Product, Stock
+from .tree_engine import CompiledModel, UnsupportedModel, predict_batch
 
 # --------------------------------------------------
 # Paths
@@ -13,118 +23,393 @@ APP_DIR = Path(__file__).resolve().parent
 MODEL_DIR = APP_DIR / "models"
 MODEL_DIR.mkdir(exist_ok=True)
 
-
-# --------------------------------------------------
-# Utilities
-# --------------------------------------------------
-def sanitize_filename(value: str) -> str:
-    """Make SKU safe for filenames"""
-    return "".join(c if c.isalnum() or c in "-_" else "_" for c in value)
+# Packed boosters; per-SKU .joblib files in MODEL_DIR are still read as a fallback
+model_store = ModelStore(MODEL_DIR / "packed")
 
 
 # --------------------------------------------------
 # Dataset loader
 # --------------------------------------------------
+SIDECAR_SUFFIX = ".parsed.feather"
+DATASET_CACHE_SIZE = 2  # ?csv= is client-supplied, so keep only the most recent frames
+_dataset_cache = OrderedDict()  # path -> (signature, DataFrame), least recently used first
+_dataset_lock = threading.Lock()
+
+
+def _source_signature(path: str) -> str:
+    stat = os.stat(path)
+    return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+
+def _read_sidecar(path: str, signature: str) -> pd.DataFrame | None:
+    """Parsed frame from the Feather sidecar, if it was built from this exact CSV."""
+    sidecar = path + SIDECAR_SUFFIX
+    if not os.path.exists(sidecar):
+        return None
+
+    try:
+        table = feather.read_table(sidecar)
+    except (OSError, pa.ArrowInvalid):
+        return None
+
+    metadata = table.schema.metadata or {}
+    if metadata.get(b"source_signature") != signature.encode():
+        return None
+    return table.to_pandas()
+
+
+def _write_sidecar(path: str, signature: str, df: pd.DataFrame):
+    sidecar = path + SIDECAR_SUFFIX
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+    except pa.ArrowException:
+        # e.g. an object column mixing ints and strings: no sidecar, the
+        # in-memory frame is still served
+        return
+    table = table.replace_schema_metadata({
+        **(table.schema.metadata or {}),
+        b"source_signature": signature.encode(),
+    })
+
+    tmp_path = f"{sidecar}.{os.getpid()}.tmp"
+    try:
+        feather.write_feather(table, tmp_path)
+        os.replace(tmp_path, sidecar)
+    except (OSError, pa.ArrowException):
+        # Read-only data dir: keep serving from the in-memory cache
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _parse_sales_csv(path: str) -> pd.DataFrame:
+    df = pd.read_csv(path)
+
+    if "date" in df.columns:
+        df["date"] = pd.to_datetime(df["date"], errors="coerce")
+
+    return df
+
+
 def load_sales_dataset(csv_path: str | None = None) -> pd.DataFrame:
     """
     Expected columns:
     - date
     - sku
     - qty
+
+    The DATASET_CACHE_SIZE most recently used frames are cached per process,
+    keyed on the file's mtime and size, and persisted to a Feather sidecar next to the CSV so a cold
+    process skips CSV parsing. The returned frame is shared: treat it
+    as read-only.
     """
     path = csv_path or os.environ.get("SALES_CSV")
 
     if not path or not os.path.exists(path):
+        with _dataset_lock:
+            _dataset_cache.pop(path, None)
         return pd.DataFrame(columns=["date", "sku", "qty"])
 
-    df = pd.read_csv(path)
+    signature = _source_signature(path)
+
+    with _dataset_lock:
+        cached = _dataset_cache.get(path)
+        if cached and cached[0] == signature:
+            _dataset_cache.move_to_end(path)
+            return cached[1]
+        # Drop a frame for an older version of the file before parsing the new one
+        _dataset_cache.pop(path, None)
+
+    df = _read_sidecar(path, signature)
+    if df is None:
+        df = _parse_sales_csv(path)
+        _write_sidecar(path, signature, df)
+
+    with _dataset_lock:
+        _dataset_cache[path] = (signature, df)
+        _dataset_cache.move_to_end(path)
+        while len(_dataset_cache) > DATASET_CACHE_SIZE:
+            _dataset_cache.popitem(last=False)
+    return df
 
-    if "date" in df.columns:
-        df["date"] = pd.to_datetime(df["date"], errors="coerce")
 
-    return df
+# --------------------------------------------------
+# Model cache
+# --------------------------------------------------
+def compile_model(raw: bytes, fallback):
+    """
+    Compile booster JSON for NumPy inference; boosters the tree engine
+    can't handle are loaded with xgboost via fallback() instead.
+    """
+    try:
+        return CompiledModel.from_json(raw)
+    except UnsupportedModel:
+        return fallback()
+
+
+def _load_legacy(path: Path):
+    model = joblib.load(path)
+    return compile_model(bytes(model.get_booster().save_raw("json")), lambda: model)
+
+
+class ModelCache:
+    """
+    Bounded LRU of loaded models keyed by model key (see model_store.model_key).
+    Models are held compiled (tree_engine.CompiledModel) where possible.
+
+    Each lookup checks the model's current location in the packed store
+    (or the legacy .joblib mtime) and reloads it when that changed, so
+    models rewritten by train_models are picked up without a restart.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()  # key -> (signature, model)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _source(key: str):
+        """(signature, loader) for the current version of a model, or (None, None)."""
+        entry = model_store.entry(key)
+        if entry is not None:
+            return entry, lambda: compile_model(model_store.get_raw(key), lambda: model_store.load(key))
+
+        legacy_path = MODEL_DIR / f"{key}.joblib"
+        try:
+            mtime = legacy_path.stat().st_mtime_ns
+        except OSError:
+            return None, None
+        return ("joblib", mtime), lambda: _load_legacy(legacy_path)
+
+    def get(self, key: str):
+        signature, loader = self._source(key)
+        if signature is None:
+            with self._lock:
+                self._entries.pop(key, None)
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == signature:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        try:
+            model = loader()
+        except Exception:
+            return None
+
+        self.put(key, signature, model)
+        return model
+
+    def put(self, key: str, signature, model):
+        with self._lock:
+            self._entries[key] = (signature, model)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def preload(self) -> int:
+        """Load every known model (up to maxsize) so first requests are warm."""
+        keys = set(model_store.keys()) | {path.stem for path in MODEL_DIR.glob("*.joblib")}
+        loaded = 0
+        for key in sorted(keys)[:self.maxsize]:
+            if self.get(key) is not None:
+                loaded += 1
+        return loaded
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+model_cache = ModelCache(maxsize=settings.ML_MODEL_CACHE_SIZE)
 
 
 # --------------------------------------------------
 # Model loader
 # --------------------------------------------------
 def load_model_for_sku(sku: str):
-    safe_sku = sanitize_filename(sku)
-    model_path = MODEL_DIR / f"{safe_sku}.joblib"
+    return model_cache.get(model_key(sku))
 
-    if not model_path.exists():
-        return None
 
-    try:
-        return joblib.load(model_path)
-    except Exception:
+def predict_many(models: list, X) -> np.ndarray:
+    """
+    Score row i of X with models[i]. Compiled models are scored together in
+    one tree_engine pass; any xgboost fallbacks are predicted one by one.
+    """
+    X = np.asarray(X, dtype=np.float32)
+    preds = np.zeros(len(models), dtype=np.float32)
+
+    compiled = [i for i, model in enumerate(models) if isinstance(model, CompiledModel)]
+    if compiled:
+        preds[compiled] = predict_batch([models[i] for i in compiled], X[compiled])
+
+    for i, model in enumerate(models):
+        if not isinstance(model, CompiledModel):
+            preds[i] = model.predict(X[i:i + 1])[0]
+
+    return preds
+
+
+def load_global_model():
+    """The train_models --global model when ML_MODEL_MODE is "global", else None."""
+    if settings.ML_MODEL_MODE != "global":
         return None
+    return model_cache.get(GLOBAL_MODEL_KEY)
+
+
+def predict_global(model, skus: list, X) -> np.ndarray:
+    """
+    Score every SKU with the global model in one predict call. X holds the
+    per-SKU features; the SKU/category codes saved with the model are
+    appended (missing for SKUs the model was not trained on).
+    """
+    if isinstance(model, CompiledModel):
+        attributes = model.attributes
+    else:
+        attributes = model.get_booster().attributes()
+
+    sku_codes = json.loads(attributes.get("sku_codes", "{}"))
+    category_codes = json.loads(attributes.get("category_codes", "{}"))
+    codes = np.array(
+        [[sku_codes.get(sku, np.nan), category_codes.get(sku, np.nan)] for sku in skus],
+        dtype=np.float32,
+    ).reshape(len(skus), 2)
+
+    X = np.hstack([np.asarray(X, dtype=np.float32), codes])
+    return model.predict(X)
 
 
 # --------------------------------------------------
 # Core prediction logic
 # --------------------------------------------------
-def predict_daily_demand(df: pd.DataFrame, sku: str) -> float:
+def demand_features(df: pd.DataFrame) -> pd.DataFrame:
     """
-    Features:
+    Features for every SKU in the dataset, computed in one grouped pass
+    over the daily-resampled series (indexed by sku):
     - last_day_sales
     - last_7_days_sales
     - day_of_week
+    - mean_qty (fallback when there is no model)
     """
-    model = load_model_for_sku(sku)
+    columns = ["last_day", "last_7_days", "dow", "mean_qty"]
+    if df.empty or "date" not in df.columns:
+        return pd.DataFrame(columns=columns)
 
-    sku_df = df[df["sku"] == sku].copy()
+    daily = densify_daily(df.loc[df["date"].notna(), ["sku", "date", "qty"]], key="sku")
+    by_sku = daily.groupby("sku", sort=False)
+    last = by_sku.tail(1).set_index("sku")
 
-    if sku_df.empty:
-        return 0.0
+    return pd.DataFrame({
+        "last_day": last["qty"].astype(float),
+        "last_7_days": by_sku.tail(7).groupby("sku")["qty"].sum().astype(float),
+        "dow": last["date"].dt.dayofweek,
+        "mean_qty": by_sku["qty"].mean(),
+    })[columns]
 
-    if "date" in sku_df.columns:
-        sku_df.set_index("date", inplace=True)
-        sku_df = sku_df.resample("D").sum().fillna(0)
 
-    last_day = float(sku_df["qty"].iloc[-1])
-    last_7_days = float(sku_df["qty"].tail(7).sum())
-    dow = sku_df.index[-1].dayofweek
-
-    X = [[last_day, last_7_days, dow]]
-
-    # Model prediction
-    if model:
+def predict_demand_batch(df: pd.DataFrame, skus) -> dict:
+    """
+    Daily demand estimate for each SKU, from a single pass over the dataset
+    and one batched model evaluation (one predict call in global mode).
+    SKUs without sales get 0.0.
+    """
+    features = demand_features(df)
+    global_model = load_global_model()
+    results = {}
+    scored, models = [], []
+
+    for sku in skus:
+        if sku not in features.index:
+            results[sku] = 0.0
+            continue
+
+        model = global_model or load_model_for_sku(sku)
+        if model:
+            scored.append(sku)
+            models.append(model)
+        else:
+            # Fallback: average demand
+            results[sku] = round(float(features.at[sku, "mean_qty"]), 2)
+
+    if scored:
+        X = features.loc[scored, ["last_day", "last_7_days", "dow"]].to_numpy(dtype=float)
         try:
-            pred = float(model.predict(X)[0])
-            return max(0.0, pred)
+            if global_model:
+                preds = predict_global(global_model, scored, X)
+            else:
+                preds = predict_many(models, X)
         except Exception:
-            pass
+            preds = None
+
+        for i, sku in enumerate(scored):
+            if preds is None:
+                results[sku] = round(float(features.at[sku, "mean_qty"]), 2)
+            else:
+                results[sku] = max(0.0, float(preds[i]))
 
-    # Fallback: average demand
-    return round(sku_df["qty"].mean(), 2)
+    return {sku: results[sku] for sku in skus}
+
+
+def predict_daily_demand(df: pd.DataFrame, sku: str) -> float:
+    return predict_demand_batch(df[df["sku"] == sku], [sku])[sku]
 
 
 # --------------------------------------------------
 # Reorder suggestion generator
 # --------------------------------------------------
-def generate_reorder_suggestions(csv_path: str | None = None) -> list[dict]:
+def stock_on_hand(store_id=None) -> dict:
+    """Current stock per product id (optionally for one store), in one query."""
+    qs = Stock.objects.all()
+    if store_id is not None:
+        qs = qs.filter(store_id=store_id)
+
+    rows = qs.values_list("product_id").annotate(total=Sum("quantity")).order_by()
+    return dict(rows)
+
+
+def generate_reorder_suggestions(csv_path: str | None = None, store_id=None) -> list[dict]:
+    """
+    Reorder suggestion per product. Runs two queries regardless of catalog
+    size: the product list and one grouped stock-on-hand snapshot.
+    """
     df = load_sales_dataset(csv_path)
+    products = list(
+        Product.objects.values_list("id", "sku", "lead_time_days", "safety_stock")
+    )
+    stock = stock_on_hand(store_id)
+    demand = predict_demand_batch(df, [sku for _, sku, _, _ in products])
     results = []
 
-    for product in Product.objects.all():
-        daily_demand = predict_daily_demand(df, product.sku)
-
-        current_stock = (
-            Stock.objects.filter(product=product)
-            .aggregate(total=Sum("quantity"))["total"]
-            or 0
-        )
+    for product_id, sku, lead_time_days, safety_stock in products:
+        daily_demand = demand[sku]
+        current_stock = stock.get(product_id) or 0
 
-        lead_time_demand = daily_demand * max(1, product.lead_time_days)
+        lead_time_demand = daily_demand * max(1, lead_time_days)
 
         reorder_qty = max(
             0,
-            int(round(lead_time_demand + product.safety_stock - current_stock))
+            int(round(lead_time_demand + safety_stock - current_stock))
         )
 
         results.append({
-            "sku": product.sku,
+            "sku": sku,
             "predicted_daily_demand": round(daily_demand, 2),
             "current_stock": int(current_stock),
             "recommended_reorder_qty": reorder_qty,
@@ -0,0 +1,213 @@
+"""
+Packed model store.
+
+All SKU boosters live in one append-only data file, saved in XGBoost's
+native JSON format, plus a small JSON index of {key: [offset, length]}:
+
+    models/packed/index.json
+    models/packed/models-000001.bin
+
+Readers memory-map the data file and slice out only the models they need.
+Writers append and then atomically replace the index; when more than half
+of the data file is superseded entries it is compacted into a new file.
+Writers and compaction hold an exclusive flock on models/packed/writer.lock,
+so train_models, the retrain job and pack_models can't interleave.
+
+No Django imports, so training workers can use it too.
+"""
+import json
+import mmap
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, run one writer at a time
+    fcntl = None
+
+INDEX_NAME = "index.json"
+LOCK_NAME = "writer.lock"
+GLOBAL_MODEL_KEY = "__global__"  # store key of the train_models --global model
+
+
+def model_key(sku: str) -> str:
+    """Store key (and legacy .joblib file stem) for a SKU."""
+    return "".join([c if c.isalnum() else "_" for c in sku])
+
+
+class ModelStore:
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.index_path = self.root / INDEX_NAME
+        self._lock = threading.Lock()
+        self._index_mtime = None
+        self._index = {"data_file": None, "models": {}}
+        self._mmap = None
+
+    # ---------- reading ----------
+    def _read_index(self) -> dict:
+        try:
+            return json.loads(self.index_path.read_text())
+        except FileNotFoundError:
+            return {"data_file": None, "models": {}}
+
+    def _refresh(self, attempts: int = 3):
+        """Reload the index (and remap the data file) if a writer replaced it."""
+        for _ in range(attempts):
+            try:
+                stat = self.index_path.stat()
+                mtime = (stat.st_mtime_ns, stat.st_ino)
+            except OSError:
+                mtime = None
+
+            if mtime == self._index_mtime:
+                return
+
+            index = self._read_index() if mtime is not None else {"data_file": None, "models": {}}
+
+            data_map = None
+            if index["data_file"]:
+                try:
+                    with open(self.root / index["data_file"], "rb") as fh:
+                        data_map = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+                except FileNotFoundError:
+                    continue  # compacted away since we read the index: reload it
+
+            self._index, self._mmap, self._index_mtime = index, data_map, mtime
+            return
+        # Still inconsistent: keep serving the previous index and mapping
+
+    def entry(self, key: str):
+        """(data_file, offset, length) for a key, or None. Changes when the model is rewritten."""
+        with self._lock:
+            self._refresh()
+            location = self._index["models"].get(key)
+            if location is None:
+                return None
+            return (self._index["data_file"], *location)
+
+    def __contains__(self, key: str) -> bool:
+        return self.entry(key) is not None
+
+    def keys(self) -> list:
+        with self._lock:
+            self._refresh()
+            return list(self._index["models"])
+
+    def get_raw(self, key: str) -> bytes | None:
+        """The booster's JSON bytes, read from the memory-mapped data file."""
+        with self._lock:
+            self._refresh()
+            location = self._index["models"].get(key)
+            if location is None:
+                return None
+            offset, length = location
+            return self._mmap[offset:offset + length]
+
+    def load(self, key: str):
+        """An XGBRegressor for the key, or None."""
+        raw = self.get_raw(key)
+        if raw is None:
+            return None
+
+        from xgboost import XGBRegressor
+
+        model = XGBRegressor()
+        model.load_model(bytearray(raw))
+        return model
+
+    def location(self, key: str) -> str:
+        return f"{self.root}#{key}"
+
+    # ---------- writing (one writer at a time) ----------
+    @contextmanager
+    def _exclusive(self):
+        """Hold the store's writer lock (blocks while another process writes)."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        with open(self.root / LOCK_NAME, "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    @contextmanager
+    def writer(self):
+        """
+        Append models with writer.put(key, raw). The index is committed when
+        the block exits, even on error, so finished models are never lost.
+        The writer lock is held for the whole block, and the index is read
+        after taking it, so entries committed by an earlier writer are kept.
+        """
+        with self._exclusive():
+            index = self._read_index()
+            if not index["data_file"]:
+                index["data_file"] = "models-000001.bin"
+
+            writer = _StoreWriter(self, index)
+            try:
+                yield writer
+            finally:
+                writer.close()
+
+    def _write_index(self, index: dict):
+        tmp_path = self.index_path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(index))
+        os.replace(tmp_path, self.index_path)
+
+    def compact(self):
+        """Rewrite live models into a fresh data file and drop the old one."""
+        with self._exclusive():
+            self._compact(self._read_index())
+
+    def _compact(self, index: dict):
+        """compact() for a caller already holding the writer lock."""
+        if not index["data_file"]:
+            return
+
+        old_file = self.root / index["data_file"]
+        generation = int(index["data_file"].split("-")[1].split(".")[0]) + 1
+        new_name = f"models-{generation:06d}.bin"
+        new_models = {}
+
+        with open(old_file, "rb") as src, open(self.root / new_name, "wb") as dst:
+            for key, (offset, length) in index["models"].items():
+                src.seek(offset)
+                new_models[key] = [dst.tell(), length]
+                dst.write(src.read(length))
+            dst.flush()
+            os.fsync(dst.fileno())
+
+        self._write_index({"data_file": new_name, "models": new_models})
+        old_file.unlink()  # open mmaps stay valid until readers refresh
+
+
+class _StoreWriter:
+    def __init__(self, store: ModelStore, index: dict):
+        self.store = store
+        self.index = index
+        self.written = 0
+        self._fh = open(store.root / index["data_file"], "ab")
+
+    def put(self, key: str, raw: bytes):
+        offset = self._fh.seek(0, os.SEEK_END)
+        self._fh.write(raw)
+        self.index["models"][key] = [offset, len(raw)]
+        self.written += 1
+
+    def close(self):
+        self._fh.flush()
+        os.fsync(self._fh.fileno())
+        size = self._fh.tell()
+        self._fh.close()
+
+        if self.written:
+            self.store._write_index(self.index)
+
+            live = sum(length for _, length in self.index["models"].values())
+            if size > 2 * live:
+                self.store._compact(self.index)
@@ -1,6 +1,11 @@
-from django.db import models
+import datetime
+
+from django.db import IntegrityError, models, transaction
+from django.db.models import DecimalField, F, Sum
 from django.contrib.auth.models import AbstractUser
 
+from .signals import sales_changed
+
 # -------------------------
 # Store Model
 # -------------------------
@@ -70,6 +75,9 @@ class Stock(models.Model):
 
     class Meta:
         unique_together = ("store", "product")
+        indexes = [
+            models.Index(fields=["last_updated", "id"]),  # keyset pagination
+        ]
         ordering = ["product__name"]
 
     def is_low_stock(self):
@@ -82,21 +90,121 @@ class Stock(models.Model):
 # -------------------------
 # Transaction Model
 # -------------------------
+class TransactionQuerySet(models.QuerySet):
+    """
+    Keeps DailySales in step for queryset-level deletes and updates (admin
+    "delete selected", filter().update()), which bypass Transaction.save()
+    and delete(). Bulk paths that rebuild the rollup themselves pass
+    rollup=False.
+    """
+
+    ROLLUP_FIELDS = {"store", "store_id", "product", "product_id", "date", "quantity_sold", "unit_price"}
+
+    def rollup_totals(self) -> list:
+        """[(store_id, product_id, date, qty, revenue)] for the matching rows."""
+        return list(
+            self.order_by()
+            .values_list("store_id", "product_id", "date")
+            .annotate(
+                qty=Sum("quantity_sold"),
+                revenue=Sum(F("quantity_sold") * F("unit_price"), output_field=DecimalField(max_digits=14, decimal_places=2)),
+            )
+        )
+
+    @staticmethod
+    def apply_to_rollup(totals: list, sign: int):
+        for store_id, product_id, day, qty, revenue in totals:
+            DailySales.add(store_id, product_id, day, sign * (qty or 0), sign * (revenue or 0))
+
+    def delete(self, rollup: bool = True):
+        if not rollup:
+            return super().delete()
+
+        with transaction.atomic():
+            list(self.select_for_update().values_list("pk", flat=True))
+            totals = self.rollup_totals()
+            deleted = super().delete()
+            self.apply_to_rollup(totals, -1)
+        sales_changed.send(sender=Transaction)
+        return deleted
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+    def update(self, rollup: bool = True, **kwargs):
+        if not rollup or not self.ROLLUP_FIELDS & kwargs.keys():
+            return super().update(**kwargs)
+
+        with transaction.atomic():
+            ids = list(self.select_for_update().values_list("pk", flat=True))
+            rows = Transaction.objects.filter(pk__in=ids)
+            before = rows.rollup_totals()
+            updated = super().update(**kwargs)
+            self.apply_to_rollup(before, -1)
+            self.apply_to_rollup(rows.rollup_totals(), 1)
+        sales_changed.send(sender=Transaction)
+        return updated
+
+    update.alters_data = True
+
+
 class Transaction(models.Model):
     store = models.ForeignKey(Store, on_delete=models.CASCADE, related_name="transactions")
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="transactions")
-    date = models.DateField(auto_now_add=True)
+    # Imported history carries its own dates; auto_now_add would overwrite
+    # them on bulk_create, so only default to today for new sales.
+    date = models.DateField(default=datetime.date.today)
     quantity_sold = models.PositiveIntegerField(default=0)
     unit_price = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    # Written by import_sales; `--upsert` only ever rewrites imported rows
+    imported = models.BooleanField(default=False, editable=False)
+
+    objects = TransactionQuerySet.as_manager()
 
     def save(self, *args, **kwargs):
         if not self.unit_price:
             self.unit_price = self.product.unit_price
-        super().save(*args, **kwargs)
+
+        # Keep DailySales in step: take back the old row's totals, add the new ones.
+        # The old row is read locked, so concurrent edits can't both subtract it.
+        with transaction.atomic():
+            previous = None
+            if self.pk is not None:
+                previous = (
+                    Transaction.objects.select_for_update().filter(pk=self.pk)
+                    .values_list("store_id", "product_id", "date", "quantity_sold", "unit_price")
+                    .first()
+                )
+
+            super().save(*args, **kwargs)
+            if previous:
+                store_id, product_id, day, qty, price = previous
+                DailySales.add(store_id, product_id, day, -qty, -qty * price)
+            DailySales.add(
+                self.store_id, self.product_id, self.date,
+                self.quantity_sold, self.quantity_sold * self.unit_price,
+            )
+        sales_changed.send(sender=Transaction)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            # Take back what is stored, not this possibly stale instance's values
+            current = (
+                Transaction.objects.select_for_update().filter(pk=self.pk)
+                .values_list("store_id", "product_id", "date", "quantity_sold", "unit_price")
+                .first()
+            )
+            deleted = super().delete(*args, **kwargs)
+            if current:
+                store_id, product_id, day, qty, price = current
+                DailySales.add(store_id, product_id, day, -qty, -qty * price)
+        sales_changed.send(sender=Transaction)
+        return deleted
 
     class Meta:
         indexes = [
-            models.Index(fields=["date"]),
+            # (date, id) also serves date-only lookups; keyset pagination walks it
+            models.Index(fields=["date", "id"]),
             models.Index(fields=["product"]),
         ]
         ordering = ["-date"]
@@ -105,6 +213,89 @@ class Transaction(models.Model):
         return f"{self.product} | {self.quantity_sold} units | {self.date}"
 
 
+# -------------------------
+# Daily Sales Rollup
+# -------------------------
+class DailySales(models.Model):
+    """
+    Transaction totals per store, product and day.
+
+    Transaction.save()/delete() keep it current row by row, and
+    TransactionQuerySet.delete()/update() per affected key; imports go
+    through inventory.rollup_service. bulk_create/bulk_update and raw SQL
+    bypass all of these: rebuild the affected days afterwards.
+    Rebuild from scratch with `manage.py rebuild_daily_sales`.
+    """
+    store = models.ForeignKey(Store, on_delete=models.CASCADE, related_name="daily_sales")
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="daily_sales")
+    date = models.DateField()
+    qty = models.BigIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ("store", "product", "date")
+        indexes = [
+            models.Index(fields=["date"]),
+            models.Index(fields=["product", "date"]),
+        ]
+        ordering = ["-date"]
+
+    @classmethod
+    def add(cls, store_id, product_id, day, qty, revenue):
+        """Add a (possibly negative) delta to one rollup row, creating it if needed."""
+        key = {"store_id": store_id, "product_id": product_id, "date": day}
+        delta = {"qty": F("qty") + qty, "revenue": F("revenue") + revenue}
+
+        if cls.objects.filter(**key).update(**delta):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(**key, qty=qty, revenue=revenue)
+        except IntegrityError:
+            # Created concurrently since the update above
+            cls.objects.filter(**key).update(**delta)
+
+    def __str__(self):
+        return f"{self.date} | {self.store} | {self.product} | {self.qty} units"
+
+
+# -------------------------
+# Sales Import Hash (re-import change detection)
+# -------------------------
+class SalesChunkHash(models.Model):
+    """Content hash of one day of imported sales, used to skip unchanged days."""
+    date = models.DateField(unique=True)
+    content_hash = models.CharField(max_length=16)
+    row_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["-date"]
+
+    def __str__(self):
+        return f"{self.date} | {self.content_hash} ({self.row_count} rows)"
+
+
+# -------------------------
+# Training Watermark (incremental retraining)
+# -------------------------
+class TrainingWatermark(models.Model):
+    """Snapshot of a SKU's transaction data at the time its model was last trained."""
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, related_name="training_watermark")
+    last_date = models.DateField()
+    row_count = models.PositiveIntegerField(default=0)
+    qty_total = models.BigIntegerField(default=0)
+    updates_since_refit = models.PositiveIntegerField(default=0)
+    full_fit_seconds = models.FloatField(default=0)
+    trained_at = models.DateTimeField(auto_now=True)
+
+    def matches(self, last_date, row_count, qty_total):
+        return (self.last_date, self.row_count, self.qty_total) == (last_date, row_count, qty_total)
+
+    def __str__(self):
+        return f"{self.product.sku} | {self.row_count} rows to {self.last_date}"
+
+
 # -------------------------
 # Reorder Prediction (ML Output)
 # -------------------------
@@ -118,3 +309,87 @@ class ReorderPrediction(models.Model):
 
     def __str__(self):
         return f"{self.sku} -> {self.predicted_qty}"
+
+
+# -------------------------
+# Reorder Suggestion Snapshots
+# -------------------------
+class ReorderSnapshot(models.Model):
+    """
+    One materialized run of generate_reorder_suggestions for a scope
+    (store filter + sales CSV). The reorder_suggestions endpoint serves the
+    newest snapshot and refreshes it in the background once it is stale.
+    """
+    store_id = models.PositiveIntegerField(null=True, blank=True)  # None = all stores
+    csv_path = models.CharField(max_length=255, blank=True, default="")
+    generated_at = models.DateTimeField(auto_now_add=True)
+    row_count = models.PositiveIntegerField(default=0)
+    build_seconds = models.FloatField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["store_id", "csv_path", "generated_at"]),
+        ]
+        ordering = ["-generated_at", "-id"]
+
+    def __str__(self):
+        return f"#{self.pk} store={self.store_id or 'all'} | {self.row_count} rows @ {self.generated_at}"
+
+
+class ReorderSnapshotRow(models.Model):
+    snapshot = models.ForeignKey(ReorderSnapshot, on_delete=models.CASCADE, related_name="rows")
+    sku = models.CharField(max_length=64)
+    predicted_daily_demand = models.FloatField()
+    current_stock = models.IntegerField()
+    recommended_reorder_qty = models.IntegerField()
+
+    class Meta:
+        ordering = ["id"]  # generation order (product name)
+
+    def __str__(self):
+        return f"{self.sku} -> {self.recommended_reorder_qty}"
+
+
+# -------------------------
+# Background Job
+# -------------------------
+class Job(models.Model):
+    """
+    A unit of background work (see inventory.jobs), run by `manage.py run_jobs`.
+
+    active_key holds kind + normalized params while the job is queued or
+    running and is cleared when it finishes. It is unique, so a duplicate
+    submission finds the live job instead of queueing a second one.
+    """
+    STATUS_CHOICES = (
+        ("queued", "Queued"),
+        ("running", "Running"),
+        ("succeeded", "Succeeded"),
+        ("failed", "Failed"),
+    )
+
+    kind = models.CharField(max_length=50)
+    params = models.JSONField(default=dict, blank=True)
+    active_key = models.CharField(max_length=255, null=True, blank=True, unique=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="queued")
+
+    progress = models.FloatField(default=0)
+    message = models.CharField(max_length=255, blank=True, default="")
+    stages = models.JSONField(default=list, blank=True)  # [{"name", "seconds"}]
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default="")
+    merged_requests = models.PositiveIntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "created_at"]),
+        ]
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"#{self.pk} {self.kind} ({self.status})"
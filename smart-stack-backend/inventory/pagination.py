@@ -0,0 +1,196 @@
+import base64
+import datetime
+import json
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from django.template import loader
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination on a composite key such as (date, id).
+
+    The cursor carries the key of the last row served, and the next page is
+    `WHERE key after cursor ORDER BY key LIMIT n`. With an index on the key
+    fields every page is the same index range scan: no COUNT(*) and no
+    OFFSET, so page N costs what page 1 does.
+
+    DRF's CursorPagination keys on the first ordering field only and falls
+    back to OFFSET within ties, which is slow when thousands of rows share
+    one date; here the tie-breaker is part of the cursor.
+
+    Responses look like {"next": url, "previous": url, "results": [...]}.
+    """
+
+    ordering = ("-id",)  # must end in a unique field
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+    template = "rest_framework/pagination/previous_and_next.html"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(request, view)
+
+        position, reverse = self.decode_cursor(request)
+        ordering = [self.invert(field) for field in self.ordering] if reverse else self.ordering
+
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            try:
+                queryset = queryset.filter(self.after(ordering, position))
+            except (DjangoValidationError, ValueError, TypeError):
+                # Well-formed cursor, but its values don't fit the key fields
+                self.invalid_cursor()
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        # Going forward there is a previous page iff we came from a cursor;
+        # going back there is a next page by construction
+        self.has_next = (not reverse and has_more) or (reverse and position is not None)
+        self.has_previous = (reverse and has_more) or (not reverse and position is not None)
+        self.first_position = self.position(rows[0]) if rows else None
+        self.last_position = self.position(rows[-1]) if rows else None
+        self.display_page_controls = self.has_next or self.has_previous
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    # ---------- ordering ----------
+    def get_ordering(self, request, view):
+        """The view's ?ordering= (if it has an OrderingFilter), made unique with the last key field."""
+        ordering = list(self.ordering)
+        for backend in getattr(view, "filter_backends", []):
+            if issubclass(backend, OrderingFilter):
+                requested = backend().get_ordering(request, view.get_queryset(), view)
+                if requested and list(requested) != ordering:
+                    unique = ordering[-1].lstrip("-")
+                    descending = requested[0].startswith("-")
+                    ordering = [f for f in requested if f.lstrip("-") != unique]
+                    ordering.append(f"-{unique}" if descending else unique)
+                break
+        return tuple(ordering)
+
+    @staticmethod
+    def invert(field: str) -> str:
+        return field[1:] if field.startswith("-") else f"-{field}"
+
+    @staticmethod
+    def after(ordering, position) -> Q:
+        """
+        Rows strictly after `position` in `ordering`, expanded as
+        (a > x) OR (a = x AND b > y) ..., plus a bound on the leading field
+        so the database scans only the index range it needs.
+        """
+        condition = Q()
+        equal = Q()
+        for field, value in zip(ordering, position):
+            name = field.lstrip("-")
+            op = "lt" if field.startswith("-") else "gt"
+            condition |= equal & Q(**{f"{name}__{op}": value})
+            equal &= Q(**{name: value})
+
+        leading = ordering[0]
+        bound = "lte" if leading.startswith("-") else "gte"
+        return Q(**{f"{leading.lstrip('-')}__{bound}": position[0]}) & condition
+
+    def position(self, instance) -> list:
+        values = []
+        for field in self.ordering:
+            value = getattr(instance, field.lstrip("-"))
+            if isinstance(value, (datetime.date, datetime.datetime)):
+                value = value.isoformat()
+            values.append(value)
+        return values
+
+    # ---------- cursor ----------
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def decode_cursor(self, request):
+        """(position, reverse) from ?cursor=, or (None, False) for the first page."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            position, reverse = cursor["p"], bool(cursor.get("r"))
+        except (TypeError, ValueError, KeyError):
+            self.invalid_cursor()
+
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            self.invalid_cursor()
+        return position, reverse
+
+    def invalid_cursor(self):
+        raise ValidationError({self.cursor_query_param: [self.invalid_cursor_message]})
+
+    def encode_cursor(self, position, reverse: bool) -> str:
+        cursor = {"p": position, "r": 1} if reverse else {"p": position}
+        encoded = base64.urlsafe_b64encode(json.dumps(cursor, separators=(",", ":")).encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or self.last_position is None:
+            return None
+        return self.encode_cursor(self.last_position, reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if self.first_position is None:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.first_position, reverse=True)
+
+    def get_html_context(self):
+        return {
+            "previous_url": self.get_previous_link(),
+            "next_url": self.get_next_link(),
+        }
+
+    def to_html(self):
+        return loader.get_template(self.template).render(self.get_html_context())
+
+
+class TransactionPagination(KeysetPagination):
+    ordering = ("-date", "-id")
+
+
+class StockPagination(KeysetPagination):
+    ordering = ("-last_updated", "-id")
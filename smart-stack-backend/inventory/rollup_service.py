@@ -0,0 +1,127 @@
+from decimal import Decimal
+
+import pandas as pd
+from django.db import transaction
+from django.db.models import DecimalField, F, Sum
+
+from .models import DailySales, Transaction
+from .signals import sales_changed
+
+# --------------------------------------------------
+# Settings
+# --------------------------------------------------
+ROLLUP_BATCH_SIZE = 5000   # rollup rows per INSERT/UPDATE statement
+REBUILD_CHUNK_SIZE = 20_000  # aggregated rows fetched per round trip
+
+ROLLUP_KEY = ["store_pk", "product_pk", "date"]
+
+
+def revenue_sum():
+    return Sum(
+        F("quantity_sold") * F("unit_price"),
+        output_field=DecimalField(max_digits=14, decimal_places=2),
+    )
+
+
+# --------------------------------------------------
+# Incremental updates
+# --------------------------------------------------
+def price_cents(prices: pd.Series) -> pd.Series:
+    """Decimal unit prices as int64 cents, converting each distinct price once."""
+    cents = {price: int(Decimal(price or 0).scaleb(2)) for price in prices.unique()}
+    return prices.map(cents).astype("int64")
+
+
+def add_frame(df: pd.DataFrame, batch_size: int = ROLLUP_BATCH_SIZE) -> int:
+    """
+    Add freshly inserted transactions to DailySales.
+
+    Expects the importer's resolved chunk columns (store_pk, product_pk,
+    date, quantity_sold, unit_price). Rows are summed per key first, with
+    revenue in integer cents, then existing rollup rows are incremented
+    with one bulk_update and missing ones bulk_created. Call inside the
+    import's transaction.
+    Returns the number of rollup rows touched.
+    """
+    if df.empty:
+        return 0
+
+    df = df.assign(
+        store_pk=df["store_pk"].astype("int64"),
+        product_pk=df["product_pk"].astype("int64"),
+        date=pd.to_datetime(df["date"]).dt.date,
+        revenue_cents=df["quantity_sold"].astype("int64") * price_cents(df["unit_price"]),
+    )
+    totals = df.groupby(ROLLUP_KEY).agg(qty=("quantity_sold", "sum"), revenue_cents=("revenue_cents", "sum"))
+
+    existing = {
+        (row.store_id, row.product_id, row.date): row
+        for row in DailySales.objects.select_for_update().filter(
+            date__in=totals.index.get_level_values("date").unique().tolist(),
+            product_id__in=totals.index.get_level_values("product_pk").unique().tolist(),
+        )
+    }
+
+    to_update, to_create = [], []
+    for (store_pk, product_pk, day), qty, cents in zip(totals.index, totals["qty"], totals["revenue_cents"]):
+        revenue = Decimal(int(cents)).scaleb(-2)
+        row = existing.get((store_pk, product_pk, day))
+        if row is None:
+            to_create.append(DailySales(
+                store_id=store_pk, product_id=product_pk, date=day, qty=int(qty), revenue=revenue
+            ))
+        else:
+            row.qty += int(qty)
+            row.revenue += revenue
+            to_update.append(row)
+
+    DailySales.objects.bulk_update(to_update, ["qty", "revenue"], batch_size=batch_size)
+    DailySales.objects.bulk_create(to_create, batch_size=batch_size)
+    sales_changed.send(sender=DailySales)
+    return len(totals)
+
+
+# --------------------------------------------------
+# Rebuild
+# --------------------------------------------------
+def rebuild(start=None, end=None, days=None, batch_size: int = ROLLUP_BATCH_SIZE) -> int:
+    """
+    Recompute DailySales from Transaction, for every day or only for the
+    given date range / list of days. Use after bulk_create/bulk_update or
+    raw SQL on Transaction. Returns the number of rollup rows written.
+    """
+    transactions = Transaction.objects.all()
+    rollup = DailySales.objects.all()
+    if start is not None:
+        transactions, rollup = transactions.filter(date__gte=start), rollup.filter(date__gte=start)
+    if end is not None:
+        transactions, rollup = transactions.filter(date__lte=end), rollup.filter(date__lte=end)
+    if days is not None:
+        transactions, rollup = transactions.filter(date__in=days), rollup.filter(date__in=days)
+
+    rows = (
+        transactions
+        .values_list("store_id", "product_id", "date")
+        .annotate(qty=Sum("quantity_sold"), revenue=revenue_sum())
+        .order_by()
+    )
+
+    written = 0
+    with transaction.atomic():
+        rollup.delete()
+
+        batch = []
+        for store_id, product_id, day, qty, revenue in rows.iterator(chunk_size=REBUILD_CHUNK_SIZE):
+            batch.append(DailySales(
+                store_id=store_id, product_id=product_id, date=day, qty=qty or 0, revenue=revenue or 0
+            ))
+            if len(batch) >= batch_size:
+                DailySales.objects.bulk_create(batch)
+                written += len(batch)
+                batch = []
+
+        DailySales.objects.bulk_create(batch)
+        written += len(batch)
+
+    sales_changed.send(sender=DailySales)
+    return written
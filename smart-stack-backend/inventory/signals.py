@@ -0,0 +1,7 @@
+from django.dispatch import Signal
+
+# Sent whenever transactions were written in a way that changed DailySales:
+# Transaction.save()/delete() and the bulk paths in rollup_service
+# (imports, rebuilds). Receivers should not query inside the sender's
+# transaction; defer with transaction.on_commit.
+sales_changed = Signal()
@@ -0,0 +1,78 @@
+import json
+import threading
+from collections import Counter
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Request coalescing within a worker process: while a computation for
+    (endpoint, params) is running, identical calls wait for it and share
+    its result (or its exception) instead of starting their own.
+
+        data = single_flight.do("sales_trend", {"sku": sku, "days": 30}, compute)
+
+    Nothing is cached: once the call finishes the next one runs again.
+    Results are shared between requests, so treat them as read-only.
+    Coalescing does not reach across processes: each worker has its own
+    in-flight table and counters.
+    """
+
+    def __init__(self):
+        self._calls = {}  # key -> _Call
+        self._lock = threading.Lock()
+        self.executions = Counter()  # endpoint -> computations run
+        self.merged = Counter()      # endpoint -> requests that joined one
+
+    @staticmethod
+    def key(endpoint: str, params: dict) -> str:
+        return f"{endpoint}:{json.dumps(params, sort_keys=True, separators=(',', ':'), default=str)}"
+
+    def do(self, endpoint: str, params: dict, fn):
+        key = self.key(endpoint, params)
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executions[endpoint] += 1
+            else:
+                self.merged[endpoint] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            in_flight = Counter(key.split(":", 1)[0] for key in self._calls)
+        return {
+            endpoint: {
+                "executions": self.executions[endpoint],
+                "merged": self.merged[endpoint],
+                "in_flight": in_flight[endpoint],
+            }
+            for endpoint in sorted(set(self.executions) | set(self.merged))
+        }
+
+
+single_flight = SingleFlight()
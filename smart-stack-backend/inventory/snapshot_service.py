@@ -0,0 +1,128 @@
+"""
+Materialized reorder suggestions.
+
+generate_reorder_suggestions loads the sales dataset and scores every SKU,
+so its cost grows with the catalog. The reorder_suggestions endpoint reads
+the newest ReorderSnapshot for the requested scope instead (two indexed
+queries), and a snapshot older than REORDER_SNAPSHOT_TTL is served as-is
+while the "reorder_snapshot" job builds a fresh one (stale-while-revalidate).
+"""
+import hashlib
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .ml_service import generate_reorder_suggestions
+from .models import ReorderSnapshot, ReorderSnapshotRow
+from .utils import query_budget
+
+# --------------------------------------------------
+# Settings
+# --------------------------------------------------
+SNAPSHOT_COLUMNS = ["sku", "predicted_daily_demand", "current_stock", "recommended_reorder_qty"]
+SNAPSHOTS_KEPT = 3  # per scope; older ones are deleted after each build
+ROW_BATCH_SIZE = 2000
+BUILD_QUERY_BUDGET = 2  # products + one grouped stock snapshot, independent of catalog size
+CSV_PATH_MAX_LENGTH = ReorderSnapshot._meta.get_field("csv_path").max_length
+BUILD_LOCK_PREFIX = "reorder-snapshot-build"
+BUILD_LOCK_TIMEOUT = 600  # seconds; longer than any build, and frees the lock if a worker dies
+BUILD_WAIT_INTERVAL = 0.5  # seconds between checks while another process builds
+
+
+def scope(store_id=None, csv_path=None) -> dict:
+    """Normalized snapshot scope; raises ValueError for a non-numeric store or an overlong csv."""
+    try:
+        store_id = int(store_id) if store_id not in (None, "") else None
+    except ValueError:
+        raise ValueError("store must be an integer") from None
+
+    csv_path = csv_path or ""
+    if len(csv_path) > CSV_PATH_MAX_LENGTH:
+        raise ValueError(f"csv must be at most {CSV_PATH_MAX_LENGTH} characters")
+    return {"store_id": store_id, "csv_path": csv_path}
+
+
+# --------------------------------------------------
+# Building
+# --------------------------------------------------
+def build_snapshot(store_id=None, csv_path="") -> ReorderSnapshot:
+    """Compute suggestions for a scope and store them as a new snapshot."""
+    started = time.perf_counter()
+    with query_budget(BUILD_QUERY_BUDGET, "reorder_suggestions"):
+        suggestions = generate_reorder_suggestions(csv_path=csv_path or None, store_id=store_id)
+    seconds = time.perf_counter() - started
+
+    with transaction.atomic():
+        snapshot = ReorderSnapshot.objects.create(
+            store_id=store_id,
+            csv_path=csv_path,
+            row_count=len(suggestions),
+            build_seconds=round(seconds, 3),
+        )
+        ReorderSnapshotRow.objects.bulk_create(
+            [ReorderSnapshotRow(snapshot=snapshot, **row) for row in suggestions],
+            batch_size=ROW_BATCH_SIZE,
+        )
+
+    old = ReorderSnapshot.objects.filter(store_id=store_id, csv_path=csv_path).values_list("pk", flat=True)
+    ReorderSnapshot.objects.filter(pk__in=list(old[SNAPSHOTS_KEPT:])).delete()
+    return snapshot
+
+
+# --------------------------------------------------
+# Reading
+# --------------------------------------------------
+def latest_snapshot(store_id=None, csv_path="") -> ReorderSnapshot | None:
+    return ReorderSnapshot.objects.filter(store_id=store_id, csv_path=csv_path).first()
+
+
+def is_stale(snapshot: ReorderSnapshot) -> bool:
+    age = timezone.now() - snapshot.generated_at
+    return age > timedelta(seconds=settings.REORDER_SNAPSHOT_TTL)
+
+
+def snapshot_rows(snapshot: ReorderSnapshot) -> list[dict]:
+    return list(snapshot.rows.order_by("id").values(*SNAPSHOT_COLUMNS))
+
+
+def get_snapshot(store_id=None, csv_path=""):
+    """
+    (snapshot, stale) for a scope. The first request for a scope builds
+    the snapshot inline; after that the caller refreshes stale ones.
+    """
+    snapshot = latest_snapshot(store_id, csv_path)
+    if snapshot is None:
+        return build_first_snapshot(store_id, csv_path), False
+    return snapshot, is_stale(snapshot)
+
+
+def _build_lock_key(store_id, csv_path: str) -> str:
+    digest = hashlib.sha1(csv_path.encode()).hexdigest()  # paths can exceed memcached's key length
+    return f"{BUILD_LOCK_PREFIX}:{store_id}:{digest}"
+
+
+def build_first_snapshot(store_id=None, csv_path="") -> ReorderSnapshot:
+    """
+    Build a scope's first snapshot once across worker processes: whoever
+    wins the cache.add lock builds it, everyone else waits for it to appear.
+    If the builder fails (lock released, or expired, with no snapshot) the
+    next waiter takes the lock and tries itself. Needs a shared cache backend
+    to reach across processes, like the dashboard cache invalidation.
+    """
+    key = _build_lock_key(store_id, csv_path)
+    while True:
+        if cache.add(key, 1, BUILD_LOCK_TIMEOUT):
+            try:
+                # Another process may have finished between our read and the lock
+                return latest_snapshot(store_id, csv_path) or build_snapshot(store_id, csv_path)
+            finally:
+                cache.delete(key)
+
+        time.sleep(BUILD_WAIT_INTERVAL)
+        snapshot = latest_snapshot(store_id, csv_path)
+        if snapshot is not None:
+            return snapshot
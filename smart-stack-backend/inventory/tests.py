@@ -0,0 +1,660 @@
+import base64
+import json
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, timedelta
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock
+
+import joblib
+import numpy as np
+import pandas as pd
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from xgboost import XGBRegressor
+
+from . import ml_service, rollup_service, snapshot_service
+from .import_service import SalesImporter, align_chunks_by_date, read_csv_chunks
+from .jobs import enqueue
+from .ml_service import generate_reorder_suggestions
+from .models import DailySales, Job, Product, ReorderSnapshot, SalesChunkHash, Stock, Store, Transaction, User
+from .signals import sales_changed
+from .singleflight import SingleFlight
+from .tree_engine import CompiledModel, predict_batch
+from .trend_service import lttb
+from .utils import bulk_upsert
+
+
+@override_settings(ML_MODEL_MODE="sku")
+class ReorderSuggestionQueryTests(TestCase):
+    """generate_reorder_suggestions must not issue per-product queries."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.stores = Store.objects.bulk_create([Store(name="North"), Store(name="South")])
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.data_dir = Path(tmp.name)
+
+    def build_catalog(self, size: int) -> str:
+        """Products/stock up to `size` SKUs, and a sales CSV covering them."""
+        existing = Product.objects.count()
+        products = Product.objects.bulk_create([
+            Product(sku=f"QT-{i:04d}", name=f"Product {i:04d}") for i in range(existing, size)
+        ])
+        Stock.objects.bulk_create([
+            Stock(store=store, product=product, quantity=3)
+            for product in products for store in self.stores
+        ])
+
+        start = date(2024, 1, 1)
+        rows = [
+            {"date": start + timedelta(days=d), "sku": f"QT-{i:04d}", "qty": (i + d) % 5}
+            for i in range(size) for d in range(14)
+        ]
+        path = self.data_dir / f"sales_{size}.csv"
+        pd.DataFrame(rows).to_csv(path, index=False)
+        return str(path)
+
+    def test_query_count_is_independent_of_catalog_size(self):
+        for size in (5, 60):
+            csv_path = self.build_catalog(size)
+            with self.subTest(catalog_size=size):
+                with self.assertNumQueries(2):
+                    suggestions = generate_reorder_suggestions(csv_path=csv_path)
+                self.assertEqual(len(suggestions), size)
+                self.assertTrue(all(s["current_stock"] == 6 for s in suggestions))
+
+    def test_store_filter_keeps_query_count(self):
+        csv_path = self.build_catalog(20)
+        with self.assertNumQueries(2):
+            suggestions = generate_reorder_suggestions(csv_path=csv_path, store_id=self.stores[0].pk)
+        self.assertEqual(len(suggestions), 20)
+        self.assertTrue(all(s["current_stock"] == 3 for s in suggestions))
+
+
+class SalesUpsertTests(TestCase):
+    """import_sales --upsert: unchanged days are skipped, changed keys rewritten."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.data_dir = Path(tmp.name)
+
+    def write_feed(self, name: str, rows: list) -> str:
+        path = self.data_dir / name
+        pd.DataFrame(rows, columns=["date", "store_nbr", "family", "sales"]).to_csv(path, index=False)
+        return str(path)
+
+    def upsert(self, path: str) -> dict:
+        importer = SalesImporter()
+        totals = {"inserted": 0, "updated": 0, "unchanged": 0, "skipped_days": 0}
+        for chunk in align_chunks_by_date(read_csv_chunks(path, chunk_size=5)):
+            for key, value in importer.upsert_chunk(chunk).items():
+                totals[key] += value
+        return totals
+
+    def rollup(self) -> dict:
+        return {
+            (str(day), store, sku): qty
+            for day, store, sku, qty in DailySales.objects.values_list("date", "store__name", "product__sku", "qty")
+        }
+
+    def test_upsert_twice_unchanged_then_changed(self):
+        rows = [
+            [f"2024-03-0{d}", store, family, d * 10 + store]
+            for d in (1, 2, 3) for store in (1, 2) for family in ("BREAD", "DAIRY")
+        ]
+        feed = self.write_feed("feed.csv", rows)
+
+        first = self.upsert(feed)
+        self.assertEqual(first["inserted"], 12)
+        self.assertEqual(Transaction.objects.count(), 12)
+        self.assertEqual(SalesChunkHash.objects.count(), 3)
+
+        unchanged = self.upsert(feed)
+        self.assertEqual(unchanged, {"inserted": 0, "updated": 0, "unchanged": 0, "skipped_days": 3})
+        self.assertEqual(Transaction.objects.count(), 12)
+
+        rows[4][3] = 99                                 # 2024-03-02, store 1, BREAD
+        rows.insert(8, ["2024-03-02", 3, "BREAD", 5])   # new key on the same day
+        changed = self.upsert(self.write_feed("changed.csv", rows))
+        self.assertEqual(changed["skipped_days"], 2)
+        self.assertEqual(changed["inserted"], 1)
+        self.assertEqual(changed["updated"], 1)
+        self.assertEqual(changed["unchanged"], 3)
+
+        self.assertEqual(Transaction.objects.count(), 13)
+        self.assertEqual(
+            Transaction.objects.get(date="2024-03-02", store__name="1", product__sku="BREAD").quantity_sold, 99
+        )
+        rollup = self.rollup()
+        self.assertEqual(rollup[("2024-03-02", "1", "BREAD")], 99)
+        self.assertEqual(rollup[("2024-03-02", "3", "BREAD")], 5)
+        self.assertEqual(rollup[("2024-03-01", "1", "BREAD")], 11)
+        self.assertEqual(self.upsert(self.write_feed("again.csv", rows))["skipped_days"], 3)
+
+    def test_unsorted_feed_is_rejected(self):
+        rows = [
+            [f"2024-03-0{d}", store, "BREAD", d]
+            for d in (1, 2, 3) for store in (1, 2, 3)
+        ]
+        rows.append(["2024-03-01", 4, "BREAD", 7])  # day 1 again, chunks later
+        with self.assertRaisesMessage(ValueError, "not sorted by date"):
+            self.upsert(self.write_feed("unsorted.csv", rows))
+
+    def test_upsert_keeps_rows_entered_through_the_api(self):
+        rows = [["2024-03-01", 1, "BREAD", 10], ["2024-03-01", 2, "BREAD", 20]]
+        self.upsert(self.write_feed("feed.csv", rows))
+
+        store, product = Store.objects.get(name="1"), Product.objects.get(sku="BREAD")
+        manual = Transaction.objects.create(
+            store=store, product=product, date=date(2024, 3, 1), quantity_sold=3, unit_price=1
+        )
+        self.assertFalse(manual.imported)
+
+        rows[0][3] = 11
+        stats = self.upsert(self.write_feed("changed.csv", rows))
+        self.assertEqual((stats["updated"], stats["unchanged"]), (1, 1))
+
+        self.assertTrue(Transaction.objects.filter(pk=manual.pk).exists())
+        self.assertEqual(Transaction.objects.filter(imported=True).count(), 2)
+        self.assertEqual(self.rollup()[("2024-03-01", "1", "BREAD")], 11 + 3)
+
+    def test_bulk_upsert_omits_conflict_target_where_unsupported(self):
+        # MySQL: ON DUPLICATE KEY UPDATE, and Django rejects unique_fields
+        rows = [SalesChunkHash(date=date(2024, 3, 1), content_hash="x")]
+        for supported, expected in ((True, {"unique_fields": ["date"]}), (False, {})):
+            with self.subTest(supports_update_conflicts_with_target=supported), \
+                    mock.patch.object(connection.features, "supports_update_conflicts_with_target", supported), \
+                    mock.patch.object(SalesChunkHash.objects, "bulk_create") as bulk_create:
+                bulk_upsert(SalesChunkHash, rows, unique_fields=["date"], update_fields=["content_hash"])
+            bulk_create.assert_called_once_with(
+                rows, update_conflicts=True, update_fields=["content_hash"], batch_size=None, **expected
+            )
+
+
+class DailySalesRollupTests(TestCase):
+    """DailySales stays equal to a rebuild from Transaction on every write path."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.store = Store.objects.create(name="North")
+        cls.products = [
+            Product.objects.create(sku=f"RU-{i}", name=f"Rollup {i}", unit_price=2) for i in range(2)
+        ]
+
+    def setUp(self):
+        day = date(2024, 5, 1)
+        self.sales = [
+            Transaction.objects.create(
+                store=self.store, product=product, date=day + timedelta(days=d), quantity_sold=q
+            )
+            for product in self.products for d, q in ((0, 3), (0, 4), (1, 5))
+        ]
+
+    def rollup(self) -> dict:
+        return {
+            (product_id, day): (qty, revenue)
+            for product_id, day, qty, revenue in DailySales.objects.values_list("product_id", "date", "qty", "revenue")
+            if qty
+        }
+
+    def assertRollupMatchesRebuild(self):
+        current = self.rollup()
+        rollup_service.rebuild()
+        self.assertEqual(current, self.rollup())
+
+    def test_save_and_delete(self):
+        sale = self.sales[0]
+        sale.quantity_sold, sale.date = 10, date(2024, 5, 3)
+        sale.save()
+        self.sales[1].delete()
+        self.assertRollupMatchesRebuild()
+
+    def test_queryset_delete_and_update(self):
+        received = []
+        sales_changed.connect(lambda sender, **kwargs: received.append(sender), weak=False, dispatch_uid="t")
+        self.addCleanup(sales_changed.disconnect, dispatch_uid="t")
+
+        Transaction.objects.filter(product=self.products[0], date=date(2024, 5, 1)).delete()
+        self.assertNotIn((self.products[0].pk, date(2024, 5, 1)), self.rollup())
+        self.assertRollupMatchesRebuild()
+
+        Transaction.objects.filter(product=self.products[1]).update(quantity_sold=1, date=date(2024, 5, 9))
+        self.assertEqual(self.rollup()[(self.products[1].pk, date(2024, 5, 9))][0], 3)
+        self.assertRollupMatchesRebuild()
+        self.assertEqual(received.count(Transaction), 2)
+
+    def test_admin_delete_selected(self):
+        admin = User.objects.create_superuser(username="admin", email="admin@x.com", password="pw")
+        self.client.force_login(admin)
+        response = self.client.post(reverse("admin:inventory_transaction_changelist"), {
+            "action": "delete_selected",
+            "_selected_action": [sale.pk for sale in self.sales[:3]],
+            "post": "yes",
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Transaction.objects.count(), 3)
+        self.assertRollupMatchesRebuild()
+
+    def test_import_chunk_revenue(self):
+        Product.objects.filter(pk=self.products[1].pk).update(unit_price="1.25")
+        chunk = pd.DataFrame({
+            "date": pd.to_datetime(["2024-06-01", "2024-06-01", "2024-06-02", "2024-06-04"]),
+            "store_id": ["North"] * 4,
+            "sku": ["RU-0", "RU-1", "RU-1", "RU-1"],
+            "quantity_sold": [2, 3, 7, 1],
+        })
+        SalesImporter().import_chunk(chunk)
+
+        rollup = self.rollup()
+        self.assertEqual(rollup[(self.products[0].pk, date(2024, 6, 1))], (2, Decimal("4.00")))
+        self.assertEqual(rollup[(self.products[1].pk, date(2024, 6, 1))], (3, Decimal("3.75")))
+        self.assertEqual(rollup[(self.products[1].pk, date(2024, 6, 4))], (1, Decimal("1.25")))
+        self.assertRollupMatchesRebuild()
+
+
+class DatasetCacheTests(TestCase):
+    """load_sales_dataset keeps a bounded LRU of parsed frames."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.data_dir = Path(tmp.name)
+        patcher = mock.patch.object(ml_service, "_dataset_cache", OrderedDict())
+        self.cache = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def write_csv(self, name: str, qty: int) -> str:
+        path = self.data_dir / name
+        pd.DataFrame({"date": ["2024-01-01"], "sku": ["A"], "qty": [qty]}).to_csv(path, index=False)
+        return str(path)
+
+    def test_bounded_and_evicts_stale_signatures(self):
+        paths = [self.write_csv(f"sales_{i}.csv", i) for i in range(ml_service.DATASET_CACHE_SIZE + 1)]
+        for path in paths:
+            ml_service.load_sales_dataset(path)
+        self.assertEqual(list(self.cache), paths[1:])
+
+        ml_service.load_sales_dataset(paths[1])  # most recently used again
+        self.assertEqual(list(self.cache)[-1], paths[1])
+
+        stale = self.cache[paths[1]][0]
+        self.write_csv("sales_1.csv", 99)
+        Path(paths[1]).touch()
+        df = ml_service.load_sales_dataset(paths[1])
+        self.assertEqual(df["qty"].tolist(), [99])
+        self.assertEqual(len(self.cache), ml_service.DATASET_CACHE_SIZE)
+        self.assertNotEqual(self.cache[paths[1]][0], stale)
+
+
+class CompiledModelTests(TestCase):
+    """tree_engine scores like XGBRegressor.predict, missing values included."""
+
+    def features(self, rows: int, seed: int = 0) -> np.ndarray:
+        rng = np.random.default_rng(seed)
+        X = rng.normal(size=(rows, 3)) * [5, 20, 2]
+        X[rng.random(X.shape) < 0.2] = np.nan
+        X[:3] = np.nan  # all features missing
+        return X.astype(np.float32)
+
+    def assertMatchesXGBoost(self, regressor, X):
+        compiled = CompiledModel.from_json(bytes(regressor.get_booster().save_raw("json")))
+        np.testing.assert_allclose(compiled.predict(X), regressor.predict(X), rtol=1e-5, atol=1e-4)
+        return compiled
+
+    def test_fitted_with_missing_values(self):
+        X = self.features(500)
+        y = np.nan_to_num(X[:, 0]) * 2 + np.isnan(X[:, 1]) * 10 + np.nan_to_num(X[:, 2]) ** 2
+        regressor = XGBRegressor(n_estimators=40, max_depth=5, n_jobs=1, random_state=0).fit(X, y)
+        self.assertMatchesXGBoost(regressor, self.features(300, seed=1))
+
+    def test_committed_models(self):
+        X = self.features(200)
+        paths = sorted(ml_service.MODEL_DIR.glob("*.joblib"))[:5]
+        if not paths:
+            self.skipTest("no committed .joblib models")
+        regressors = [joblib.load(path) for path in paths]
+        compiled = [self.assertMatchesXGBoost(regressor, X) for regressor in regressors]
+
+        # Mixed batch: row i scored by model i % len(models)
+        picks = np.arange(len(X)) % len(compiled)
+        expected = np.array([regressors[m].predict(X[i:i + 1])[0] for i, m in enumerate(picks)])
+        np.testing.assert_allclose(
+            predict_batch([compiled[m] for m in picks], X), expected, rtol=1e-5, atol=1e-4
+        )
+
+
+class SingleFlightTests(SimpleTestCase):
+    """Concurrent identical calls share one execution, result or exception."""
+
+    FOLLOWERS = 4
+
+    def run_concurrently(self, flight, fn, params=None):
+        """Start a leader, let FOLLOWERS join it, then release fn; returns outcomes."""
+        release = threading.Event()
+        outcomes = []
+
+        def call():
+            try:
+                outcomes.append(("ok", flight.do("trend", params or {"sku": "A"}, lambda: fn(release))))
+            except Exception as e:
+                outcomes.append(("error", e))
+
+        threads = [threading.Thread(target=call) for _ in range(self.FOLLOWERS + 1)]
+        threads[0].start()
+        while flight.stats().get("trend", {}).get("in_flight") != 1:
+            time.sleep(0.001)
+        for thread in threads[1:]:
+            thread.start()
+        while flight.merged["trend"] < self.FOLLOWERS:
+            time.sleep(0.001)
+        release.set()
+        for thread in threads:
+            thread.join(timeout=5)
+        return outcomes
+
+    def test_followers_share_the_leaders_result(self):
+        flight, calls = SingleFlight(), []
+
+        def compute(release):
+            calls.append(1)
+            release.wait(5)
+            return {"rows": [1, 2, 3]}
+
+        outcomes = self.run_concurrently(flight, compute)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(outcomes), self.FOLLOWERS + 1)
+        results = [result for kind, result in outcomes if kind == "ok"]
+        self.assertEqual(len(results), self.FOLLOWERS + 1)
+        self.assertTrue(all(result is results[0] for result in results))
+        self.assertEqual(flight.stats(), {"trend": {"executions": 1, "merged": self.FOLLOWERS, "in_flight": 0}})
+
+    def test_exception_reaches_every_caller(self):
+        flight = SingleFlight()
+
+        def compute(release):
+            release.wait(5)
+            raise RuntimeError("boom")
+
+        outcomes = self.run_concurrently(flight, compute)
+        self.assertEqual([kind for kind, _ in outcomes], ["error"] * (self.FOLLOWERS + 1))
+        self.assertTrue(all(str(error) == "boom" for _, error in outcomes))
+
+        # Nothing is cached: the next call runs again
+        self.assertEqual(flight.do("trend", {"sku": "A"}, lambda: "fresh"), "fresh")
+        self.assertEqual(flight.stats()["trend"]["executions"], 2)
+
+    def test_different_params_do_not_merge(self):
+        flight = SingleFlight()
+        self.assertEqual(flight.key("trend", {"a": 1, "b": 2}), flight.key("trend", {"b": 2, "a": 1}))
+        flight.do("trend", {"sku": "A"}, lambda: 1)
+        flight.do("trend", {"sku": "B"}, lambda: 2)
+        flight.do("predict", {"sku": "A"}, lambda: 3)
+        self.assertEqual(flight.stats(), {
+            "predict": {"executions": 1, "merged": 0, "in_flight": 0},
+            "trend": {"executions": 2, "merged": 0, "in_flight": 0},
+        })
+
+
+class KeysetPaginationTests(TestCase):
+    """Cursor pages cover every row exactly once, ties broken on id."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="pager", email="pager@x.com", password="pw", role="manager")
+        store = Store.objects.create(name="North")
+        products = Product.objects.bulk_create([Product(sku=f"PG-{i}", name=f"Page {i}") for i in range(5)])
+        # 3 dates x 5 rows: most page boundaries fall inside a run of equal dates
+        Transaction.objects.bulk_create([
+            Transaction(store=store, product=product, date=date(2024, 7, d), quantity_sold=d)
+            for d in (1, 2, 3) for product in products
+        ])
+        Stock.objects.bulk_create([Stock(store=store, product=product, quantity=1) for product in products])
+        Stock.objects.update(last_updated=timezone.now())  # all equal
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def walk(self, url: str) -> tuple[list, list]:
+        """Ids page by page following `next`, then back again following `previous`."""
+        forward, link = [], url
+        while link:
+            body = self.client.get(link).json()
+            forward.append([row["id"] for row in body["results"]])
+            link, previous = body["next"], body["previous"]
+
+        backward = [forward[-1]]
+        while previous:
+            body = self.client.get(previous).json()
+            backward.insert(0, [row["id"] for row in body["results"]])
+            previous = body["previous"]
+        return forward, backward
+
+    def assertWalk(self, url: str, expected: list):
+        forward, backward = self.walk(url)
+        self.assertEqual(sum(forward, []), expected)
+        self.assertEqual(backward, forward)
+        self.assertGreater(len(forward), 3)
+
+    def test_transactions_with_duplicate_dates(self):
+        rows = Transaction.objects.values_list("id", "date")
+        newest_first = [pk for pk, _ in sorted(rows, key=lambda row: (row[1], row[0]), reverse=True)]
+        self.assertWalk(reverse("transactions-list") + "?page_size=4", newest_first)
+        oldest_first = [pk for pk, _ in sorted(rows, key=lambda row: (row[1], row[0]))]
+        self.assertWalk(reverse("transactions-list") + "?page_size=4&ordering=date", oldest_first)
+
+    def test_stock_with_duplicate_last_updated(self):
+        ids = sorted(Stock.objects.values_list("id", flat=True), reverse=True)
+        self.assertWalk(reverse("stock-list") + "?page_size=1", ids)
+
+    def test_invalid_cursor_is_a_bad_request(self):
+        def encode(cursor):
+            return base64.urlsafe_b64encode(json.dumps(cursor).encode()).decode()
+
+        for cursor in (
+            "not-base64!",
+            encode([1, 2]),
+            encode({"p": ["2024-07-01"]}),
+            encode({"p": ["not a date", 1]}),
+            encode({"p": ["2024-07-01", "x"]}),
+            encode({"p": ["2024-07-01", None]}),
+        ):
+            with self.subTest(cursor=cursor):
+                response = self.client.get(reverse("transactions-list"), {"cursor": cursor})
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), {"cursor": ["Invalid cursor"]})
+
+
+class LTTBTests(SimpleTestCase):
+    """Largest-Triangle-Three-Buckets downsampling."""
+
+    def test_shape_of_kept_indices(self):
+        rng = np.random.default_rng(0)
+        for size in (5, 10, 97, 365):
+            x = np.arange(size) * 2.0
+            y = rng.normal(size=size)
+            for n_out in range(3, size):
+                with self.subTest(size=size, n_out=n_out):
+                    kept = lttb(x, y, n_out)
+                    self.assertEqual(len(kept), n_out)
+                    self.assertEqual((kept[0], kept[-1]), (0, size - 1))
+                    self.assertTrue(np.all(np.diff(kept) > 0))
+
+    def test_short_series_unchanged(self):
+        for size in (0, 1, 3, 10):
+            with self.subTest(size=size):
+                np.testing.assert_array_equal(lttb(range(size), range(size), 10), np.arange(size))
+
+    def test_keeps_a_spike(self):
+        y = np.ones(200)
+        y[123] = 50
+        self.assertIn(123, lttb(np.arange(200), y, 10))
+
+    def test_rejects_fewer_than_three_points(self):
+        with self.assertRaises(ValueError):
+            lttb(range(10), range(10), 2)
+
+
+class SalesTrendApiTests(TestCase):
+    """sales_trend_api: ?max_points= downsampling and X-Total-Points."""
+
+    DAYS = 40
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="trend", email="trend@x.com", password="pw")
+        store = Store.objects.create(name="North")
+        product = Product.objects.create(sku="TR-1", name="Trend", unit_price=1)
+        today = date.today()
+        for d in range(cls.DAYS):
+            Transaction.objects.create(
+                store=store, product=product, date=today - timedelta(days=d), quantity_sold=100 if d == 17 else d % 3
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get(self, **params):
+        return self.client.get(reverse("sales-trend", args=["TR-1"]), {"days": 60, **params})
+
+    def test_full_series_without_max_points(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), self.DAYS)
+        self.assertEqual(response["X-Total-Points"], str(self.DAYS))
+
+    def test_downsampled(self):
+        full = self.get().json()
+        response = self.get(max_points=10)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Total-Points"], str(self.DAYS))
+
+        points = response.json()
+        self.assertEqual(len(points), 10)
+        self.assertEqual((points[0], points[-1]), (full[0], full[-1]))
+        dates = [point["date"] for point in points]
+        self.assertEqual(dates, sorted(set(dates)))
+        self.assertIn(100, [point["total_sold"] for point in points])
+
+    def test_shorter_series_unchanged(self):
+        response = self.get(max_points=self.DAYS)
+        self.assertEqual(response.json(), self.get().json())
+        self.assertEqual(response["X-Total-Points"], str(self.DAYS))
+
+    def test_invalid_max_points(self):
+        for value in ("2", "0", "-5", "ten"):
+            with self.subTest(max_points=value):
+                response = self.get(max_points=value)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), {"error": "max_points must be an integer >= 3"})
+
+
+@override_settings(REORDER_SNAPSHOT_TTL=900)
+class ReorderSnapshotTests(TestCase):
+    """reorder_suggestions serves snapshots: fresh, stale-while-revalidate, retention."""
+
+    SUGGESTIONS = [
+        {"sku": "A", "predicted_daily_demand": 2.5, "current_stock": 1, "recommended_reorder_qty": 17},
+        {"sku": "B", "predicted_daily_demand": 0.5, "current_stock": 9, "recommended_reorder_qty": 0},
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="snap", email="snap@x.com", password="pw")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        patcher = mock.patch.object(
+            snapshot_service, "generate_reorder_suggestions", return_value=self.SUGGESTIONS
+        )
+        self.generate = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(cache.clear)
+
+    def get(self, **params):
+        return self.client.get(reverse("stock-reorder-suggestions"), params)
+
+    def test_first_request_builds_then_fresh_snapshot_is_served(self):
+        first = self.get(store=1)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual([row["sku"] for row in first.json()], ["A", "B"])
+        self.assertEqual(first["X-Snapshot-Stale"], "0")
+
+        second = self.get(store=1)
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second["X-Snapshot-Stale"], "0")
+        self.assertNotIn("X-Snapshot-Refresh-Job", second)
+        self.assertEqual(self.generate.call_count, 1)
+        self.assertFalse(Job.objects.exists())
+
+    def test_stale_snapshot_is_served_and_refresh_queued(self):
+        snapshot = snapshot_service.build_snapshot(store_id=1)
+        ReorderSnapshot.objects.filter(pk=snapshot.pk).update(
+            generated_at=timezone.now() - timedelta(seconds=901)
+        )
+
+        response = self.get(store=1)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Snapshot-Stale"], "1")
+        self.assertEqual(len(response.json()), 2)
+
+        job = Job.objects.get()
+        self.assertEqual(response["X-Snapshot-Refresh-Job"], str(job.pk))
+        self.assertEqual((job.kind, job.params), ("reorder_snapshot", {"store_id": 1, "csv_path": ""}))
+        self.assertEqual(self.generate.call_count, 1)  # nothing rebuilt inline
+
+        self.assertEqual(self.get(store=1)["X-Snapshot-Refresh-Job"], str(job.pk))  # joins the queued job
+        self.assertEqual(Job.objects.count(), 1)
+
+    def test_keeps_the_newest_snapshots_per_scope(self):
+        other = snapshot_service.build_snapshot(store_id=2)
+        built = [snapshot_service.build_snapshot(store_id=1) for _ in range(snapshot_service.SNAPSHOTS_KEPT + 2)]
+
+        kept = list(ReorderSnapshot.objects.filter(store_id=1).values_list("pk", flat=True))
+        self.assertEqual(kept, [snapshot.pk for snapshot in reversed(built)][:snapshot_service.SNAPSHOTS_KEPT])
+        self.assertTrue(ReorderSnapshot.objects.filter(pk=other.pk).exists())
+        self.assertEqual(ReorderSnapshot.objects.get(pk=kept[0]).rows.count(), 2)
+
+    def test_first_build_waits_for_another_process(self):
+        key = snapshot_service._build_lock_key(1, "")
+        cache.add(key, 1)  # held by another worker, which finishes while we wait
+
+        def other_worker_finishes(seconds):
+            snapshot_service.build_snapshot(store_id=1)
+            cache.delete(key)
+
+        with mock.patch.object(snapshot_service.time, "sleep", side_effect=other_worker_finishes) as sleep:
+            snapshot, stale = snapshot_service.get_snapshot(store_id=1)
+        self.assertEqual(sleep.call_count, 1)
+        self.assertEqual(self.generate.call_count, 1)
+        self.assertEqual(ReorderSnapshot.objects.filter(store_id=1).get(), snapshot)
+        self.assertFalse(stale)
+
+    def test_invalid_scope(self):
+        for params, error in (
+            ({"store": "north"}, "store must be an integer"),
+            ({"csv": "x" * 256}, "csv must be at most 255 characters"),
+        ):
+            with self.subTest(**params):
+                response = self.get(**params)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), {"error": error})
+        self.assertEqual(self.get(csv="x" * 255).status_code, 200)
+
+        # The longest scope still fits Job.active_key when a refresh is queued
+        job, _ = enqueue("reorder_snapshot", snapshot_service.scope(None, "x" * 255))
+        self.assertLessEqual(len(job.active_key), 255)
@@ -0,0 +1,133 @@
+"""
+Per-SKU and global (all-SKU) model fitting.
+
+Kept free of Django imports so it can be pickled to and run inside
+process-pool workers without setting up the ORM.
+"""
+import json
+import math
+import time
+
+import pandas as pd
+from xgboost import Booster, XGBRegressor
+
+FEATURES = ["lag1", "lag7", "dow"]
+GLOBAL_FEATURES = FEATURES + ["sku_code", "category_code"]
+UPDATE_WINDOW_DAYS = 56  # trailing history refitted alongside the new days in a warm start
+
+
+def score(model, df: pd.DataFrame, features: list = FEATURES):
+    """In-sample (mae, rmse) of a model on a featurized daily frame."""
+    y = df["qty"]
+    preds = model.predict(df[features])
+    mae = math.fabs((y - preds).mean())
+    rmse = math.sqrt(((y - preds) ** 2).mean())
+    return mae, rmse
+
+
+def new_regressor(n_estimators: int, n_jobs: int | None = None) -> XGBRegressor:
+    return XGBRegressor(
+        n_estimators=n_estimators,
+        learning_rate=0.1,
+        max_depth=6,
+        subsample=0.9,
+        colsample_bytree=0.9,
+        objective="reg:squarederror",
+        random_state=42,
+        n_jobs=n_jobs,
+    )
+
+
+def train_sku_model(df: pd.DataFrame, n_estimators: int, n_jobs: int | None = None):
+    """
+    Fit one SKU's model from scratch on its featurized daily frame.
+    Returns (model, mae, rmse, fit_seconds).
+
+    Pass n_jobs=1 inside pool workers so XGBoost threads don't
+    oversubscribe the cores the pool is already using.
+    """
+    started = time.perf_counter()
+
+    model = new_regressor(n_estimators, n_jobs)
+    model.fit(df[FEATURES], df["qty"])
+
+    fit_seconds = time.perf_counter() - started
+    return (model, *score(model, df), fit_seconds)
+
+
+def update_sku_model(df: pd.DataFrame, since, model_raw: bytes, n_rounds: int, n_jobs: int | None = None,
+                     window_days: int = UPDATE_WINDOW_DAYS):
+    """
+    Warm-start: load the saved booster (XGBoost JSON bytes) and add
+    `n_rounds` trees fitted on the days after `since` plus the
+    `window_days` before it. Fitting on the new days alone lets a single
+    unusual day pull every prediction towards it. Metrics are still
+    reported over the whole frame.
+    Returns (model, mae, rmse, fit_seconds).
+    """
+    started = time.perf_counter()
+
+    booster = Booster()
+    booster.load_model(bytearray(model_raw))
+    window_start = pd.Timestamp(since) - pd.Timedelta(days=window_days)
+    recent = df[df.index > window_start]
+
+    model = new_regressor(n_rounds, n_jobs)
+    model.fit(recent[FEATURES], recent["qty"], xgb_model=booster)
+
+    fit_seconds = time.perf_counter() - started
+    return (model, *score(model, df), fit_seconds)
+
+
+def fit_sku(df: pd.DataFrame, n_estimators: int, since=None, model_raw: bytes | None = None,
+            update_rounds: int = 20, n_jobs: int | None = None):
+    """Full refit when `since` is None, otherwise a warm-start update of model_raw."""
+    if since is None:
+        return train_sku_model(df, n_estimators, n_jobs)
+    return update_sku_model(df, since, model_raw, update_rounds, n_jobs)
+
+
+# --------------------------------------------------
+# Global model (one booster for every SKU)
+# --------------------------------------------------
+def catalog_codes(catalog: dict):
+    """
+    Integer codes for a {sku: category} catalog, in sorted order:
+    returns ({sku: sku_code}, {sku: category_code}).
+    """
+    categories = {category: i for i, category in enumerate(sorted(set(catalog.values())))}
+    sku_codes = {sku: i for i, sku in enumerate(sorted(catalog))}
+    category_codes = {sku: categories[category] for sku, category in catalog.items()}
+    return sku_codes, category_codes
+
+
+def add_catalog_codes(df: pd.DataFrame, sku_codes: dict, category_codes: dict) -> pd.DataFrame:
+    """Add sku_code / category_code columns to a long frame with a sku column."""
+    return df.assign(
+        sku_code=df["sku"].map(sku_codes).astype(float),
+        category_code=df["sku"].map(category_codes).astype(float),
+    )
+
+
+def train_global_model(df: pd.DataFrame, catalog: dict, n_estimators: int, n_jobs: int | None = None):
+    """
+    Fit one model on the featurized daily frames of all SKUs, stacked into a
+    long frame with a sku column. SKU and category enter as integer codes,
+    which are saved on the booster (attributes sku_codes / category_codes)
+    so predictions can encode SKUs the same way.
+    Returns (model, mae, rmse, fit_seconds).
+    """
+    started = time.perf_counter()
+
+    sku_codes, category_codes = catalog_codes(catalog)
+    df = add_catalog_codes(df, sku_codes, category_codes)
+
+    model = new_regressor(n_estimators, n_jobs)
+    model.fit(df[GLOBAL_FEATURES], df["qty"])
+    model.get_booster().set_attr(
+        sku_codes=json.dumps(sku_codes),
+        category_codes=json.dumps(category_codes),
+    )
+
+    fit_seconds = time.perf_counter() - started
+    return (model, *score(model, df, GLOBAL_FEATURES), fit_seconds)
@@ -0,0 +1,166 @@
+"""
+Pure-NumPy inference for XGBoost tree ensembles.
+
+Boosters saved in XGBoost's JSON format are compiled into flat node arrays
+(split feature, threshold, children, default direction, leaf value). Many
+SKUs' feature rows are then scored together: every (row, tree) pair walks
+its tree in lock-step, one vectorized step per tree level, and leaf values
+are summed per row in XGBoost's order, so results match Booster.predict
+to float32 rounding. Scoring needs no xgboost import.
+
+Only plain numeric gbtree models with an identity link (reg:squarederror
+and friends) are supported; anything else raises UnsupportedModel so the
+caller can fall back to xgboost.
+"""
+import json
+
+import numpy as np
+
+IDENTITY_OBJECTIVES = {
+    "reg:squarederror",
+    "reg:squaredlogerror",
+    "reg:absoluteerror",
+    "reg:pseudohubererror",
+    "reg:quantileerror",
+}
+
+
+class UnsupportedModel(ValueError):
+    pass
+
+
+def _parse_base_score(value: str) -> float:
+    # "5E-1" in older models, "[5E-1]" (a vector) from XGBoost 3.x
+    return float(value.strip("[]").split(",")[0])
+
+
+class CompiledModel:
+    """One booster's trees flattened into node arrays (child indices are model-local)."""
+
+    __slots__ = (
+        "feature", "threshold", "left", "right", "default_left", "value",
+        "roots", "depth", "base_score", "num_feature", "attributes",
+    )
+
+    @classmethod
+    def from_json(cls, raw: bytes) -> "CompiledModel":
+        learner = json.loads(bytes(raw))["learner"]
+        booster = learner["gradient_booster"]
+        objective = learner["objective"]["name"]
+
+        if booster["name"] != "gbtree":
+            raise UnsupportedModel(f"booster {booster['name']} is not supported")
+        if objective not in IDENTITY_OBJECTIVES:
+            raise UnsupportedModel(f"objective {objective} is not supported")
+
+        params = learner["learner_model_param"]
+        if int(params.get("num_class", 0)) > 1 or int(params.get("num_target", 1)) > 1:
+            raise UnsupportedModel("multi-output models are not supported")
+
+        features, thresholds, lefts, rights, defaults, values, roots = [], [], [], [], [], [], []
+        depth = 0
+        offset = 0
+
+        for tree in booster["model"]["trees"]:
+            if any(tree.get("split_type", [])):
+                raise UnsupportedModel("categorical splits are not supported")
+
+            left = np.asarray(tree["left_children"], dtype=np.int32)
+            right = np.asarray(tree["right_children"], dtype=np.int32)
+            is_leaf = left == -1
+            node_ids = np.arange(len(left), dtype=np.int32)
+
+            # Leaves point at themselves so every walk can run a fixed number of steps
+            lefts.append(np.where(is_leaf, node_ids, left) + offset)
+            rights.append(np.where(is_leaf, node_ids, right) + offset)
+            features.append(np.asarray(tree["split_indices"], dtype=np.int32))
+            thresholds.append(np.asarray(tree["split_conditions"], dtype=np.float32))
+            defaults.append(np.asarray(tree["default_left"], dtype=bool))
+            # For leaves XGBoost stores the leaf value in split_conditions
+            values.append(np.where(is_leaf, thresholds[-1], 0).astype(np.float32))
+
+            roots.append(offset)
+            depth = max(depth, _tree_depth(left, right))
+            offset += len(left)
+
+        model = cls()
+        model.feature = np.concatenate(features) if features else np.zeros(0, np.int32)
+        model.threshold = np.concatenate(thresholds) if thresholds else np.zeros(0, np.float32)
+        model.left = np.concatenate(lefts) if lefts else np.zeros(0, np.int32)
+        model.right = np.concatenate(rights) if rights else np.zeros(0, np.int32)
+        model.default_left = np.concatenate(defaults) if defaults else np.zeros(0, bool)
+        model.value = np.concatenate(values) if values else np.zeros(0, np.float32)
+        model.roots = np.asarray(roots, dtype=np.int32)
+        model.depth = depth
+        model.base_score = _parse_base_score(params["base_score"])
+        model.num_feature = int(params["num_feature"])
+        model.attributes = learner.get("attributes", {})
+        return model
+
+    @property
+    def num_trees(self) -> int:
+        return len(self.roots)
+
+    def predict(self, X) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float32)
+        return predict_batch([self] * len(X), X)
+
+
+def _tree_depth(left: np.ndarray, right: np.ndarray) -> int:
+    depth, level = 0, np.array([0])
+    while True:
+        children = np.concatenate([left[level], right[level]])
+        level = children[children != -1]
+        if level.size == 0:
+            return depth
+        depth += 1
+
+
+def predict_batch(models: list, X) -> np.ndarray:
+    """
+    Score row i of X with models[i], for all rows in one vectorized traversal.
+    Models may repeat; each distinct model's arrays are stacked once.
+    """
+    X = np.asarray(X, dtype=np.float32)
+    n_rows = len(models)
+    if n_rows == 0:
+        return np.zeros(0, dtype=np.float32)
+
+    # Stack each distinct model's node arrays once
+    slot_of = {}
+    distinct = []
+    for model in models:
+        if id(model) not in slot_of:
+            slot_of[id(model)] = len(distinct)
+            distinct.append(model)
+
+    offsets = np.cumsum([0] + [len(m.feature) for m in distinct[:-1]])
+    feature = np.concatenate([m.feature for m in distinct])
+    threshold = np.concatenate([m.threshold for m in distinct])
+    left = np.concatenate([m.left + off for m, off in zip(distinct, offsets)])
+    right = np.concatenate([m.right + off for m, off in zip(distinct, offsets)])
+    default_left = np.concatenate([m.default_left for m in distinct])
+    value = np.concatenate([m.value for m in distinct])
+
+    # One walker per (row, tree)
+    slots = np.fromiter((slot_of[id(m)] for m in models), dtype=np.int64, count=n_rows)
+    trees_per_row = np.array([distinct[s].num_trees for s in slots], dtype=np.int64)
+    row_of_walker = np.repeat(np.arange(n_rows), trees_per_row)
+    node = np.concatenate([distinct[s].roots + offsets[s] for s in slots])
+
+    for _ in range(max(m.depth for m in distinct)):
+        x = X[row_of_walker, feature[node]]
+        go_left = np.where(np.isnan(x), default_left[node], x < threshold[node])
+        node = np.where(go_left, left[node], right[node])
+
+    # Sum leaves like XGBoost does: float32, base score first, then tree by
+    # tree. A float64 sum drifts visibly when the base score is large.
+    starts = np.cumsum(trees_per_row) - trees_per_row
+    position = np.arange(len(node)) - np.repeat(starts, trees_per_row)
+    leaves = np.zeros((n_rows, trees_per_row.max()), dtype=np.float32)
+    leaves[row_of_walker, position] = value[node]
+
+    prediction = np.array([m.base_score for m in distinct], dtype=np.float32)[slots]
+    for column in leaves.T:
+        prediction += column
+    return prediction
@@ -0,0 +1,167 @@
+from datetime import date, timedelta
+
+import numpy as np
+from django.db.models import F, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+
+from .models import DailySales, Store
+
+# --------------------------------------------------
+# Settings
+# --------------------------------------------------
+BUCKETS = {
+    "day": None,
+    "week": TruncWeek,    # buckets start on Monday
+    "month": TruncMonth,  # buckets start on the 1st
+}
+MAX_SERIES = 50
+
+
+# --------------------------------------------------
+# Buckets
+# --------------------------------------------------
+def bucket_start(day: date, bucket: str) -> date:
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    if bucket == "month":
+        return day.replace(day=1)
+    return day
+
+
+def bucket_range(start: date, end: date, bucket: str) -> list[date]:
+    """Start date of every bucket overlapping [start, end], in order."""
+    periods = []
+    current = bucket_start(start, bucket)
+    while current <= end:
+        periods.append(current)
+        if bucket == "week":
+            current += timedelta(days=7)
+        elif bucket == "month":
+            current = date(current.year + current.month // 12, current.month % 12 + 1, 1)
+        else:
+            current += timedelta(days=1)
+    return periods
+
+
+# --------------------------------------------------
+# Downsampling
+# --------------------------------------------------
+def lttb(x, y, n_out: int) -> np.ndarray:
+    """
+    Indices of the points kept when reducing a series to n_out points with
+    Largest-Triangle-Three-Buckets: first and last points are kept, and
+    from each of the n_out - 2 buckets in between the point forming the
+    largest triangle with the previously kept point and the next bucket's
+    mean. Peaks and dips survive, unlike plain striding or averaging.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    size = len(x)
+    if n_out >= size:
+        return np.arange(size)
+    if n_out < 3:
+        raise ValueError("n_out must be at least 3")
+
+    every = (size - 2) / (n_out - 2)
+    starts = (np.arange(n_out - 2) * every).astype(np.int64) + 1
+    ends = np.append(starts[1:], size - 1)
+    counts = ends - starts
+
+    # Mean of each bucket, plus the last point as the "next bucket" of the last one
+    mean_x = np.append(np.add.reduceat(x[:-1], starts) / counts, x[-1])
+    mean_y = np.append(np.add.reduceat(y[:-1], starts) / counts, y[-1])
+
+    kept = np.empty(n_out, dtype=np.int64)
+    kept[0], kept[-1] = 0, size - 1
+    a = 0
+    for i, (start, end) in enumerate(zip(starts, ends)):
+        area = np.abs(
+            (x[a] - mean_x[i + 1]) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (mean_y[i + 1] - y[a])
+        )
+        a = start + int(np.argmax(area))
+        kept[i + 1] = a
+    return kept
+
+
+# --------------------------------------------------
+# Trends
+# --------------------------------------------------
+def sales_trends(start: date, end: date, bucket: str = "day", skus=None, store_ids=None) -> dict:
+    """
+    Bucketed sales for several SKUs or stores from one grouped DailySales
+    query, gap-filled so every series has a value for every bucket:
+
+        {"bucket": "week", "group_by": "sku", "periods": [...],
+         "series": [{"key": "SKU001", "label": "SKU001", "qty": [...], "revenue": [...]}]}
+
+    Series are per SKU when skus are given (optionally restricted to
+    store_ids), otherwise per store. The first and last buckets may cover
+    only part of their period.
+    """
+    skus, store_ids = list(skus or []), list(store_ids or [])
+    if bucket not in BUCKETS:
+        raise ValueError(f"bucket must be one of: {', '.join(BUCKETS)}")
+    if not skus and not store_ids:
+        raise ValueError("Pass at least one sku or store")
+
+    group_by = "sku" if skus else "store"
+    keys = skus if skus else store_ids
+    if len(keys) > MAX_SERIES:
+        raise ValueError(f"At most {MAX_SERIES} series per request")
+
+    qs = DailySales.objects.filter(date__range=[start, end])
+    if skus:
+        qs = qs.filter(product__sku__in=skus)
+    if store_ids:
+        qs = qs.filter(store_id__in=store_ids)
+
+    trunc = BUCKETS[bucket]
+    key_field = "product__sku" if group_by == "sku" else "store_id"
+    rows = (
+        qs.annotate(period=trunc("date") if trunc else F("date"))
+        .values_list("period", key_field)
+        .annotate(total_qty=Sum("qty"), total_revenue=Sum("revenue"))
+        .order_by()
+    )
+
+    periods = bucket_range(start, end, bucket)
+    period_index = {period: i for i, period in enumerate(periods)}
+    key_index = {key: i for i, key in enumerate(keys)}
+    # MySQL's default collation matches ?sku=sku001 to SKU001: fall back to a
+    # case-insensitive lookup, and skip anything the collation folds further
+    folded_index = {str(key).casefold(): i for i, key in reversed(list(enumerate(keys)))}
+    labels = {}
+    qty = np.zeros((len(keys), len(periods)), dtype=np.int64)
+    revenue = np.zeros((len(keys), len(periods)), dtype=np.float64)
+
+    for period, key, total_qty, total_revenue in rows:
+        if hasattr(period, "date"):  # TruncX can come back as a datetime on some backends
+            period = period.date()
+        i = key_index.get(key, folded_index.get(str(key).casefold()))
+        if i is None:
+            continue
+        j = period_index[period]
+        qty[i, j] += total_qty or 0
+        revenue[i, j] += float(total_revenue or 0)
+        labels[keys[i]] = key
+
+    if group_by == "store":
+        labels = dict(Store.objects.filter(id__in=keys).values_list("id", "name"))
+
+    return {
+        "bucket": bucket,
+        "group_by": group_by,
+        "start": start,
+        "end": end,
+        "periods": periods,
+        "series": [
+            {
+                "key": key,
+                "label": labels.get(key, key),
+                "qty": qty[i].tolist(),
+                "revenue": revenue[i].round(2).tolist(),
+            }
+            for i, key in enumerate(keys)
+        ],
+    }
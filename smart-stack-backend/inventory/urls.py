@@ -10,10 +10,19 @@ from .views import (
     # ML / Analytics
     predict_sku_api,
     retrain_models_api,
+    generate_reorders_api,
+    job_status_api,
+    ml_cache_stats_api,
     sales_trend_api,
+    sales_trends_api,
     reorder_predictions_api,
     reorder_trend_api,
 
+    # Exports
+    export_transactions_api,
+    export_stock_api,
+    export_reorder_suggestions_api,
+
     # Dashboard / Alerts
     dashboard_summary_api,
     low_stock_alerts_api,
@@ -47,12 +56,23 @@ urlpatterns = [
     # -------- ML --------
     path("ml/predict/", predict_sku_api, name="predict-sku"),
     path("ml/retrain/", retrain_models_api, name="retrain-models"),
+    path("ml/generate-reorders/", generate_reorders_api, name="generate-reorders"),
+    path("ml/cache-stats/", ml_cache_stats_api, name="ml-cache-stats"),
+
+    # -------- JOBS --------
+    path("jobs/<int:job_id>/", job_status_api, name="job-status"),
 
     # -------- ANALYTICS --------
     path("analytics/sales-trend/<str:sku>/", sales_trend_api, name="sales-trend"),
+    path("analytics/sales-trends/", sales_trends_api, name="sales-trends"),
     path("analytics/reorder-predictions/", reorder_predictions_api, name="reorder-predictions"),
     path("analytics/reorder-trend/", reorder_trend_api, name="reorder-trend"),
 
+    # -------- EXPORTS (fmt: csv | ndjson) --------
+    path("export/transactions.<str:fmt>", export_transactions_api, name="export-transactions"),
+    path("export/stock.<str:fmt>", export_stock_api, name="export-stock"),
+    path("export/reorder-suggestions.<str:fmt>", export_reorder_suggestions_api, name="export-reorder-suggestions"),
+
     # -------- DASHBOARD --------
     path("dashboard/summary/", dashboard_summary_api, name="dashboard-summary"),
 
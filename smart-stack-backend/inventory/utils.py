@@ -1,5 +1,45 @@
+import logging
+from contextlib import contextmanager
+
 from django.core.mail import send_mail
 from django.conf import settings
+from django.db import connection, connections, router
+
+logger = logging.getLogger(__name__)
+
+
+@contextmanager
+def query_budget(max_queries: int, label: str = "block"):
+    """
+    Count the SQL queries run inside the block and log a warning when a
+    code path regresses to per-row queries. Never raises: the enforced
+    checks live in inventory/tests.py.
+    """
+    executed = []
+
+    def counter(execute, sql, params, many, context):
+        executed.append(sql)
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(counter):
+        yield executed
+
+    if len(executed) > max_queries:
+        logger.warning("%s ran %d queries (budget %d)", label, len(executed), max_queries)
+
+
+
+def bulk_upsert(model, objs, unique_fields: list, update_fields: list, batch_size: int | None = None):
+    """
+    bulk_create(update_conflicts=True) that runs on every backend. MySQL's
+    ON DUPLICATE KEY UPDATE takes no conflict target and Django rejects
+    unique_fields there, so they are only passed where supported.
+    """
+    features = connections[router.db_for_write(model)].features
+    target = {"unique_fields": unique_fields} if features.supports_update_conflicts_with_target else {}
+    return model.objects.bulk_create(
+        objs, update_conflicts=True, update_fields=update_fields, batch_size=batch_size, **target
+    )
 
 
 def send_low_stock_email(stock_items):
@@ -3,8 +3,9 @@ from pathlib import Path
 
 import pandas as pd
 from django.contrib.auth import get_user_model
-from django.core.management import call_command
 from django.db.models import Sum
+from django.http import StreamingHttpResponse
+from django.urls import reverse
 
 from rest_framework import viewsets, filters, status
 from rest_framework.decorators import api_view, permission_classes, action
@@ -13,7 +14,7 @@ from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework_simplejwt.views import TokenObtainPairView
 
-from .models import Product, Store, Stock, Transaction, ReorderPrediction
+from .models import Product, Store, Stock, Transaction, ReorderPrediction, DailySales, Job
 from .serializers import (
     ProductSerializer,
     StoreSerializer,
@@ -22,7 +23,15 @@ from .serializers import (
     ReorderSuggestionSerializer,
     EmailTokenObtainPairSerializer
 )
-from .ml_service import generate_reorder_suggestions, predict_for_sku
+from .ml_service import predict_for_sku, model_cache
+from .dashboard_service import get_summary
+from .export_service import EXPORT_FORMATS, STOCK_COLUMNS, TRANSACTION_COLUMNS, iter_queryset_rows, stream_rows
+from .filters import StockFilter, TransactionFilter
+from .jobs import describe, enqueue
+from .pagination import StockPagination, TransactionPagination
+from .singleflight import single_flight
+from .trend_service import lttb, sales_trends
+from . import snapshot_service
 
 # =========================
 # GLOBALS
@@ -84,24 +93,45 @@ class StockViewSet(viewsets.ModelViewSet):
     queryset = Stock.objects.select_related("product", "store")
     serializer_class = StockSerializer
     permission_classes = [IsManagerOrReadOnly]
+    pagination_class = StockPagination
 
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
-    filterset_fields = ["store", "product"]
+    filterset_class = StockFilter
     search_fields = ["product__name", "product__sku"]
 
     @action(detail=False, methods=["get"], permission_classes=[IsAuthenticated])
     def reorder_suggestions(self, request):
-        csv_path = request.GET.get("csv")
+        """
+        Latest reorder snapshot for ?store=/?csv=. A stale snapshot is still
+        served, and a background refresh is queued (X-Snapshot-* headers).
+        Identical concurrent requests are coalesced within this process only.
+        """
         try:
-            suggestions = generate_reorder_suggestions(csv_path=csv_path)
-            serializer = ReorderSuggestionSerializer(suggestions, many=True)
-            return Response(serializer.data)
+            snapshot_scope = snapshot_service.scope(request.GET.get("store"), request.GET.get("csv"))
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        def load():
+            snapshot, stale = snapshot_service.get_snapshot(**snapshot_scope)
+            refresh_job = enqueue("reorder_snapshot", snapshot_scope)[0] if stale else None
+            rows = ReorderSuggestionSerializer(snapshot_service.snapshot_rows(snapshot), many=True).data
+            return snapshot, stale, refresh_job, rows
+
+        try:
+            snapshot, stale, refresh_job, rows = single_flight.do("reorder_suggestions", snapshot_scope, load)
         except Exception as e:
             return Response(
                 {"error": "Failed to generate suggestions", "details": str(e)},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+        response = Response(rows)
+        response["X-Snapshot-Generated-At"] = snapshot.generated_at.isoformat()
+        response["X-Snapshot-Stale"] = "1" if stale else "0"
+        if refresh_job:
+            response["X-Snapshot-Refresh-Job"] = str(refresh_job.pk)
+        return response
+
 
 # =========================
 # TRANSACTION
@@ -110,9 +140,10 @@ class TransactionViewSet(viewsets.ModelViewSet):
     queryset = Transaction.objects.select_related("product", "store")
     serializer_class = TransactionSerializer
     permission_classes = [IsManagerOrReadOnly]
+    pagination_class = TransactionPagination
 
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ["product__sku", "store__name", "date"]
+    filterset_class = TransactionFilter
     search_fields = ["product__name", "store__location"]
     ordering_fields = ["date", "quantity_sold"]
     ordering = ["-date"]
@@ -124,22 +155,52 @@ class TransactionViewSet(viewsets.ModelViewSet):
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def predict_sku_api(request):
+    """Forecast for ?sku=; concurrent requests for one SKU share a prediction (per process)."""
     sku = request.GET.get("sku")
     if not sku:
         return Response({"error": "SKU query parameter is required"}, status=400)
 
     try:
-        result = predict_for_sku(sku)
+        result = single_flight.do("predict", {"sku": sku}, lambda: predict_for_sku(sku))
         return Response(result)
     except Exception as e:
         return Response({"error": "Prediction failed", "details": str(e)}, status=500)
 
 
+def job_accepted(job, merged):
+    return Response(
+        {**describe(job), "merged": merged, "status_url": reverse("job-status", args=[job.pk])},
+        status=status.HTTP_202_ACCEPTED,
+    )
+
+
 @api_view(["POST"])
 @permission_classes([IsManagerOrReadOnly])
 def retrain_models_api(request):
-    call_command("train_models", force=True)
-    return Response({"message": "Models retrained successfully"})
+    """Queue a full retrain for the run_jobs worker; poll the returned job for progress."""
+    return job_accepted(*enqueue("retrain"))
+
+
+@api_view(["POST"])
+@permission_classes([IsManagerOrReadOnly])
+def generate_reorders_api(request):
+    return job_accepted(*enqueue("generate_reorders"))
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def job_status_api(request, job_id):
+    job = Job.objects.filter(pk=job_id).first()
+    if job is None:
+        return Response({"error": "Job not found"}, status=404)
+    return Response(describe(job))
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def ml_cache_stats_api(request):
+    """Model cache and request coalescing counters for the worker process that answers."""
+    return Response({"models": model_cache.stats(), "coalesced_requests": single_flight.stats()})
 
 
 # =========================
@@ -148,18 +209,76 @@ def retrain_models_api(request):
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def sales_trend_api(request, sku):
+    """
+    Daily units sold for one SKU over ?days=. With ?max_points=N (N >= 3)
+    longer series are downsampled to N points with LTTB; X-Total-Points
+    carries the original length. Identical concurrent requests share one
+    query, within this process only.
+    """
     days = int(request.GET.get("days", 30))
+    try:
+        max_points = int(request.GET["max_points"]) if request.GET.get("max_points") else None
+    except ValueError:
+        max_points = 0
+    if max_points is not None and max_points < 3:
+        return Response({"error": "max_points must be an integer >= 3"}, status=400)
+
     end_date = date.today()
     start_date = end_date - timedelta(days=days)
 
     qs = (
-        Transaction.objects
+        DailySales.objects
         .filter(product__sku=sku, date__range=[start_date, end_date])
         .values("date")
-        .annotate(total_sold=Sum("quantity_sold"))
+        .annotate(total_sold=Sum("qty"))
         .order_by("date")
     )
-    return Response(list(qs))
+    params = {"sku": sku, "start": start_date, "end": end_date}
+    trend = single_flight.do("sales_trend", params, lambda: list(qs))
+
+    total = len(trend)
+    if max_points and total > max_points:
+        x = [row["date"].toordinal() for row in trend]
+        y = [row["total_sold"] for row in trend]
+        trend = [trend[i] for i in lttb(x, y, max_points)]
+
+    response = Response(trend)
+    response["X-Total-Points"] = str(total)
+    return response
+
+
+def list_param(request, name: str, sep: str | None = None) -> list:
+    """Repeated ?name= values (each also split on sep), without blanks or duplicates."""
+    raw = request.GET.getlist(name)
+    values = (v.strip() for r in raw for v in (r.split(sep) if sep else [r]))
+    return list(dict.fromkeys(v for v in values if v))
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def sales_trends_api(request):
+    """
+    Columnar, gap-filled trends for many SKUs and/or stores in one call:
+    ?sku=A&sku=B&store=1,2&bucket=day|week|month&days=90
+    """
+    try:
+        days = int(request.GET.get("days", 90))
+        store_ids = [int(v) for v in list_param(request, "store", sep=",")]
+    except ValueError:
+        return Response({"error": "days and store must be integers"}, status=400)
+
+    end_date = date.today()
+    start_date = end_date - timedelta(days=max(0, days))
+    try:
+        data = sales_trends(
+            start_date, end_date,
+            bucket=request.GET.get("bucket", "day"),
+            skus=list_param(request, "sku"),
+            store_ids=store_ids,
+        )
+    except ValueError as e:
+        return Response({"error": str(e)}, status=400)
+    return Response(data)
 
 
 @api_view(["GET"])
@@ -180,27 +299,63 @@ def reorder_trend_api(request):
     return Response(df.to_dict(orient="records"))
 
 
+# =========================
+# EXPORTS (streamed)
+# =========================
+def streamed_export(fmt, name, columns, rows):
+    if fmt not in EXPORT_FORMATS:
+        return Response({"error": f"Unsupported format: {fmt}"}, status=404)
+
+    response = StreamingHttpResponse(stream_rows(fmt, columns, rows), content_type=EXPORT_FORMATS[fmt])
+    response["Content-Disposition"] = f'attachment; filename="{name}.{fmt}"'
+    return response
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def export_transactions_api(request, fmt):
+    filterset = TransactionFilter(request.GET, queryset=Transaction.objects.all())
+    if not filterset.is_valid():
+        return Response(filterset.errors, status=400)
+
+    rows = iter_queryset_rows(filterset.qs, list(TRANSACTION_COLUMNS.values()))
+    return streamed_export(fmt, "transactions", list(TRANSACTION_COLUMNS), rows)
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def export_stock_api(request, fmt):
+    filterset = StockFilter(request.GET, queryset=Stock.objects.all())
+    if not filterset.is_valid():
+        return Response(filterset.errors, status=400)
+
+    rows = iter_queryset_rows(filterset.qs, list(STOCK_COLUMNS.values()))
+    return streamed_export(fmt, "stock", list(STOCK_COLUMNS), rows)
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def export_reorder_suggestions_api(request, fmt):
+    try:
+        snapshot_scope = snapshot_service.scope(request.GET.get("store"), request.GET.get("csv"))
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    snapshot, stale = snapshot_service.get_snapshot(**snapshot_scope)
+    if stale:
+        enqueue("reorder_snapshot", snapshot_scope)
+    columns = snapshot_service.SNAPSHOT_COLUMNS
+    rows = iter_queryset_rows(snapshot.rows.all(), columns)
+    return streamed_export(fmt, "reorder_suggestions", columns, rows)
+
+
 # =========================
 # DASHBOARD
 # =========================
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def dashboard_summary_api(request):
-    top_sku = (
-        Transaction.objects
-        .values("product__sku")
-        .annotate(total=Sum("quantity_sold"))
-        .order_by("-total")
-        .first()
-    )
-
-    return Response({
-        "total_products": Product.objects.count(),
-        "total_stock": Stock.objects.aggregate(total=Sum("quantity"))["total"] or 0,
-        "low_stock_items": Stock.objects.filter(quantity__lt=10).count(),
-        "today_sales": Transaction.objects.filter(date=date.today()).aggregate(total=Sum("quantity_sold"))["total"] or 0,
-        "top_sku": top_sku["product__sku"] if top_sku else None
-    })
+    return Response(get_summary())
 
 
 @api_view(["GET"])